@@ -15,4 +15,4 @@ login = LoginManager(app)
 login.login_view = 'index'
 
 from app.log_utils import logger
-from app import routes, models
\ No newline at end of file
+from app import database, routes, api, models, cli
\ No newline at end of file
@@ -0,0 +1,125 @@
+from datetime import timezone
+
+from flask import jsonify, request, url_for
+from flask_login import current_user, login_required
+from werkzeug.http import is_resource_modified
+
+from app import app
+from app.auth import admin_required
+from app.autocomplete import autocomplete
+from app.stats import grade_stats, school_student_stats, school_teacher_stats
+from app.versions import current_version
+
+
+def _stats_grade():
+    # 非管理员只能查看本学届，管理员可用 grade 参数指定学届，缺省为全部学届
+    if current_user.grade_name:
+        return current_user.grade_name
+    return request.args.get("grade") or None
+
+
+def versioned_json(versions, build):
+    """以数据版本生成 ETag 和 Last-Modified 的 JSON 响应
+
+    客户端携带的 If-None-Match 或 If-Modified-Since 仍然有效时直接返回304，
+    只读取数据版本表，不计算统计。
+    """
+    etag = "-".join(f"{version.id}.{version.version}" for version in versions)
+    # 数据版本记录的是服务器本地时间，HTTP 日期须为 UTC
+    last_modified = max(version.updated_at for version in versions).astimezone(
+        timezone.utc
+    )
+
+    if not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    ):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # 每次都向服务器确认，数据未变时只需一次304往返
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route("/api/stats/students")
+@login_required
+def api_student_stats():
+    grade_name = _stats_grade()
+
+    def build():
+        student_stats, total_stats, has_exam_type = school_student_stats(grade_name)
+        return {
+            "grade_name": grade_name,
+            "has_exam_type": has_exam_type,
+            "schools": student_stats,
+            "total": total_stats,
+        }
+
+    versions = [current_version("students", grade_name), current_version("users")]
+    return versioned_json(versions, build)
+
+
+@app.route("/api/stats/teachers")
+@login_required
+def api_teacher_stats():
+    grade_name = _stats_grade()
+
+    def build():
+        teacher_stats, total_stats = school_teacher_stats(grade_name)
+        return {
+            "grade_name": grade_name,
+            "schools": teacher_stats,
+            "total": total_stats,
+        }
+
+    versions = [current_version("teachers", grade_name), current_version("users")]
+    return versioned_json(versions, build)
+
+
+@app.route("/api/stats/grades")
+@login_required
+@admin_required
+def api_grade_stats():
+    versions = [
+        current_version("students"),
+        current_version("teachers"),
+        current_version("users"),
+    ]
+    return versioned_json(versions, lambda: {"grades": grade_stats()})
+
+
+@app.route("/api/search/students")
+@login_required
+def api_search_students():
+    students = autocomplete(
+        "students",
+        request.args.get("q", ""),
+        current_user.school_name,
+        current_user.grade_name,
+    )
+    return jsonify(
+        {
+            "results": [
+                {**student, "url": url_for("edit_student", student_id=student["id"])}
+                for student in students
+            ]
+        }
+    )
+
+
+@app.route("/api/search/teachers")
+@login_required
+def api_search_teachers():
+    teachers = autocomplete(
+        "teachers", request.args.get("q", ""), current_user.school_name
+    )
+    return jsonify(
+        {
+            "results": [
+                {**teacher, "url": url_for("edit_teacher", teacher_id=teacher["id"])}
+                for teacher in teachers
+            ]
+        }
+    )
@@ -0,0 +1,132 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from app import app, db
+from app.models import Student, Teacher
+from app.versions import current_version
+
+# 各名单的 (模型, 返回给前端的列, 用于前缀匹配的列)，最后一列是以空格分隔的多个读音
+SOURCES = {
+    "students": (
+        Student,
+        (
+            Student.id,
+            Student.name,
+            Student.exam_no,
+            Student.class_name,
+            Student.exam_type,
+        ),
+        (
+            Student.name,
+            Student.name_pinyin,
+            Student.name_initials,
+            Student.exam_no,
+            Student.name_pinyin_variants,
+        ),
+    ),
+    "teachers": (
+        Teacher,
+        (
+            Teacher.id,
+            Teacher.name,
+            Teacher.code,
+            Teacher.teaching_grade,
+            Teacher.subjects,
+        ),
+        (
+            Teacher.name,
+            Teacher.name_pinyin,
+            Teacher.name_initials,
+            Teacher.code,
+            Teacher.name_pinyin_variants,
+        ),
+    ),
+}
+
+
+class PrefixIndex:
+    """一个学校（考生还按学届）的前缀索引
+
+    每条记录的姓名、拼音、拼音首字母、首字其他读音的拼音和考号或身份证号都作为键，
+    所有键排序后存成数组，查找时二分定位第一个不小于前缀的键，
+    向后扫描到不再以前缀开头为止。
+    """
+
+    def __init__(self, entries, keys):
+        pairs = sorted(
+            (key.lower(), position)
+            for position, entry_keys in enumerate(keys)
+            for key in entry_keys
+            if key
+        )
+        self.entries = entries
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+    def lookup(self, prefix, limit):
+        prefix = prefix.lower()
+        found = {}
+        for index in range(bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[index].startswith(prefix):
+                break
+            # 同一记录可能有多个键匹配，如姓名拼音和首字母
+            found.setdefault(self.positions[index])
+            if len(found) == limit:
+                break
+        return [self.entries[position] for position in found]
+
+
+# 每个 gunicorn 进程各自缓存：(名单, 学校, 学届) -> [索引, 数据版本, 上次检查时间]
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def _build_index(kind, school_name, grade_name):
+    model, columns, key_columns = SOURCES[kind]
+    criteria = [model.school_name == school_name]
+    if kind == "students":
+        criteria.append(Student.grade_name == grade_name)
+    rows = db.session.execute(select(*columns, *key_columns).where(*criteria))
+    entries, keys = [], []
+    for row in rows:
+        entries.append(dict(zip(row._fields[: len(columns)], row[: len(columns)])))
+        *row_keys, variants = row[len(columns) :]
+        keys.append([*row_keys, *(variants or "").split()])
+    return PrefixIndex(entries, keys)
+
+
+def autocomplete(kind, prefix, school_name, grade_name=None):
+    """按前缀查找本校（考生还限本学届）的名单，返回最多 AUTOCOMPLETE_LIMIT 条记录
+
+    索引在首次查找时建立，之后每隔 AUTOCOMPLETE_CHECK_INTERVAL 秒才读取一次数据版本，
+    版本变化时重建；其余查找完全在内存中完成，不访问数据库。
+    """
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    if kind == "teachers":
+        # 教师按学校分区，任一学届的教师变化都要重建
+        grade_name = None
+
+    partition = (kind, school_name, grade_name)
+    now = time.monotonic()
+    with _lock:
+        cached = _indexes.get(partition)
+        if cached is not None:
+            _indexes.move_to_end(partition)
+    if cached is None or now - cached[2] >= app.config["AUTOCOMPLETE_CHECK_INTERVAL"]:
+        # 先读版本再建索引，建索引期间的写入会在下次检查时触发重建
+        version = current_version(kind, grade_name).version
+        if cached is None or cached[1] != version:
+            cached = [_build_index(kind, school_name, grade_name), version, now]
+        else:
+            cached[2] = now
+        with _lock:
+            _indexes[partition] = cached
+            while len(_indexes) > app.config["AUTOCOMPLETE_MAX_PARTITIONS"]:
+                _indexes.popitem(last=False)
+    return cached[0].lookup(prefix, app.config["AUTOCOMPLETE_LIMIT"])
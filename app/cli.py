@@ -0,0 +1,51 @@
+import click
+from flask.cli import AppGroup
+
+from app import app
+from app.models import Student, Teacher
+from app.search import fill_name_pinyin, rebuild_search_index
+from app.stats import rebuild_stats, verify_stats
+
+stats_cli = AppGroup("stats", help="维护按学校、学届汇总的统计表")
+search_cli = AppGroup("search", help="维护考生和教师的全文搜索索引和拼音列")
+
+
+@stats_cli.command("rebuild")
+def rebuild_command():
+    """从考生表和教师表全量重建统计表"""
+    rows = rebuild_stats()
+    click.echo(f"统计表已重建，共 {rows} 行")
+
+
+@stats_cli.command("verify")
+def verify_command():
+    """检查统计表是否与考生表和教师表一致，不一致时以非零状态退出"""
+    mismatches = verify_stats()
+    if not mismatches:
+        click.echo("统计表与名单数据一致")
+        return
+
+    for kind, school_name, grade_name, category, stored, actual in mismatches:
+        click.echo(
+            f"{kind} {school_name} {grade_name or '-'} {category or '-'}: "
+            f"统计表 {stored}，实际 {actual}"
+        )
+    click.echo(f"共 {len(mismatches)} 处不一致，可运行 flask stats rebuild 重建")
+    raise SystemExit(1)
+
+
+@search_cli.command("rebuild")
+def rebuild_search_command():
+    """补算缺失的姓名拼音，创建缺失的全文索引并从考生表和教师表重建"""
+    for model in (Student, Teacher):
+        filled = fill_name_pinyin(model)
+        click.echo(f"{model.__tablename__} 补算拼音 {filled} 行")
+    if rebuild_search_index():
+        click.echo("全文索引已重建")
+    else:
+        click.echo("当前数据库不支持 FTS5 三元组索引，搜索将使用 LIKE")
+        raise SystemExit(1)
+
+
+app.cli.add_command(stats_cli)
+app.cli.add_command(search_cli)
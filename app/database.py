@@ -0,0 +1,63 @@
+import random
+import sqlite3
+import time
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, logger
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """在一个 SQLite 连接上执行一组 PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def _on_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_pragmas(dbapi_connection, app.config["SQLITE_PRAGMAS"])
+
+
+# 每个 gunicorn 进程的连接池在建立新连接时都应用同一套 PRAGMA
+with app.app_context():
+    if db.engine.dialect.name == "sqlite":
+        event.listen(db.engine, "connect", _on_connect)
+
+
+def is_database_locked(exc):
+    """是否为 SQLite 的数据库被锁错误"""
+    return isinstance(exc, OperationalError) and "database is locked" in str(exc)
+
+
+def retry_on_lock(func):
+    """写入遇到数据库锁时回滚并按指数退避重试整个函数
+
+    busy_timeout 已让单条语句等待锁释放，这里处理等待超时后仍失败的情况，
+    例如其他进程正在提交一次很大的导入。被装饰的函数必须可以安全地重复执行。
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = app.config["DB_LOCK_RETRIES"]
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if not is_database_locked(e) or attempt == retries:
+                    raise
+                db.session.rollback()
+                delay = app.config["DB_LOCK_BACKOFF"] * 2**attempt
+                # 加入随机抖动，避免多个进程同时重试再次冲突
+                delay *= random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"{func.__name__} 遇到数据库锁，{delay:.2f} 秒后第 {attempt + 1} 次重试"
+                )
+                time.sleep(delay)
+
+    return wrapper
@@ -0,0 +1,238 @@
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import zlib
+
+import xlsxwriter
+
+from app import app, logger
+from app.models import Student, Teacher
+from app.queries import export_student_rows, export_teacher_rows, grade_has_exam_type
+from app.subjects import ELECTIVE_SUBJECTS, subject_indexes
+from app.versions import current_version
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIMETYPE = "text/csv"
+GZIP_MIMETYPE = "application/gzip"
+
+STUDENT_COLUMNS = [
+    ("学校代码", Student.school_code),
+    ("学校名称", Student.school_name),
+    ("班级代码", Student.class_name),
+    ("学届", Student.grade_name),
+    ("姓名", Student.name),
+    ("考生类型", Student.exam_type),
+    ("考号", Student.exam_no),
+    ("科类属性", Student.subject_type),
+]
+
+TEACHER_COLUMNS = [
+    ("编码", Teacher.code),
+    ("姓名", Teacher.name),
+    ("单位", Teacher.school_name),
+    ("任教学届", Teacher.teaching_grade),
+    ("密码", Teacher.password),
+    ("任教学科", Teacher.subjects),
+    ("角色", Teacher.role),
+    ("性别", Teacher.gender),
+    ("是否启用", Teacher.enabled),
+]
+
+
+class StreamingSheet:
+    """按行顺序写入的工作表，配合 constant_memory 模式每写完一行即落盘"""
+
+    def __init__(self, workbook, name, header, header_format):
+        self.worksheet = workbook.add_worksheet(name)
+        self.worksheet.write_row(0, 0, header, header_format)
+        self.next_row = 1
+
+    def append(self, values):
+        self.worksheet.write_row(self.next_row, 0, values)
+        self.next_row += 1
+
+
+def _new_workbook(output):
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+    return output, workbook, header_format
+
+
+def _finish_workbook(output, workbook):
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+def build_student_workbook(grade_name, output):
+    """流式生成考生名单工作簿写入 output，返回已定位到开头的 output
+
+    指定学届时只导出该学届考生，已分科时同时写入各科目工作表。
+    所有工作表在一次遍历中逐行写入，内存占用与考生人数无关。
+    """
+    has_exam_type = bool(grade_name) and grade_has_exam_type(grade_name)
+    header = [title for title, _ in STUDENT_COLUMNS]
+    exam_type_index = header.index("考生类型")
+    output, workbook, header_format = _new_workbook(output)
+    all_sheet = StreamingSheet(workbook, "全部学生", header, header_format)
+    subject_sheets = []
+    if has_exam_type:
+        # 分科后按科目拆分工作表，顺序同 ELECTIVE_SUBJECTS
+        subject_sheets = [
+            StreamingSheet(workbook, name, header, header_format)
+            for _, name, _ in ELECTIVE_SUBJECTS
+        ]
+
+    rows = export_student_rows([column for _, column in STUDENT_COLUMNS], grade_name)
+    for row in rows:
+        all_sheet.append(row)
+        if subject_sheets:
+            for index in subject_indexes(row[exam_type_index]):
+                subject_sheets[index].append(row)
+
+    return _finish_workbook(output, workbook)
+
+
+def build_teacher_workbook(grade_name, output):
+    """流式生成教师名单工作簿写入 output，返回已定位到开头的 output"""
+    header = [title for title, _ in TEACHER_COLUMNS]
+    output, workbook, header_format = _new_workbook(output)
+    sheet = StreamingSheet(workbook, "教师列表", header, header_format)
+    rows = export_teacher_rows([column for _, column in TEACHER_COLUMNS], grade_name)
+    for row in rows:
+        *values, enabled = row
+        sheet.append([*values, "是" if enabled else "否"])
+
+    return _finish_workbook(output, workbook)
+
+
+def _csv_chunks(header, rows, compress=False):
+    """把行逐批编码为CSV字节块，可选gzip压缩，供流式响应逐块发送
+
+    文本带 UTF-8 BOM，Excel 打开时中文不会乱码。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # wbits=31 生成带gzip文件头的压缩流
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    batch_size = app.config["EXPORT_BATCH_SIZE"]
+
+    def drain():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor:
+            # 同步刷新，每批数据压缩后立即可发给客户端
+            return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data
+
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    # 表头立即发出，客户端不必等待第一批数据
+    yield drain()
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield drain()
+
+    tail = drain()
+    if compressor:
+        tail += compressor.flush()
+    yield tail
+
+
+def student_csv_chunks(grade_name=None, compress=False):
+    """流式生成考生名单CSV，与xlsx导出的“全部学生”工作表内容相同"""
+    header = [title for title, _ in STUDENT_COLUMNS]
+    rows = export_student_rows([column for _, column in STUDENT_COLUMNS], grade_name)
+    return _csv_chunks(header, rows, compress)
+
+
+def teacher_csv_chunks(grade_name=None, compress=False):
+    """流式生成教师名单CSV，与xlsx导出内容相同"""
+    header = [title for title, _ in TEACHER_COLUMNS]
+    rows = export_teacher_rows([column for _, column in TEACHER_COLUMNS], grade_name)
+    rows = ((*values, "是" if enabled else "否") for *values, enabled in rows)
+    return _csv_chunks(header, rows, compress)
+
+
+EXPORT_BUILDERS = {
+    "students": build_student_workbook,
+    "teachers": build_teacher_workbook,
+}
+
+
+def _cache_dir():
+    cache_dir = os.path.join(app.instance_path, "export_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _evict_cache(cache_dir, keep):
+    """缓存总大小超过上限时，按最近使用时间从旧到新删除文件"""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith(".tmp-"):
+            continue  # 其他进程正在生成的文件
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= app.config["EXPORT_CACHE_SIZE"]:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def cached_export(kind, grade_name=None):
+    """返回某学届导出文件的缓存路径和 ETag，数据版本变化后重新生成
+
+    缓存文件放在 instance 目录下，由所有 gunicorn 进程共享，
+    文件名包含数据版本，先写临时文件再改名，其他进程不会读到写了一半的文件。
+    """
+    version = current_version(kind, grade_name).version
+    grade_key = "all"
+    if grade_name:
+        grade_key = hashlib.sha1(grade_name.encode()).hexdigest()[:12]
+    prefix = f"{kind}-{grade_key}-"
+    etag = f"{prefix}v{version}"
+    cache_dir = _cache_dir()
+    path = os.path.join(cache_dir, etag + ".xlsx")
+
+    if os.path.exists(path):
+        # 更新修改时间，作为按最近使用淘汰的依据
+        os.utime(path)
+        return path, etag
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w+b") as output:
+            EXPORT_BUILDERS[kind](grade_name, output)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    logger.info(f"生成导出缓存 {etag}")
+
+    # 同一学届的旧版本已不会再被使用
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name != etag + ".xlsx":
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+    _evict_cache(cache_dir, path)
+    return path, etag
@@ -1,6 +1,13 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileAllowed, FileField, FileRequired
-from wtforms import BooleanField, PasswordField, SelectField, StringField, SubmitField
+from wtforms import (
+    BooleanField,
+    PasswordField,
+    RadioField,
+    SelectField,
+    StringField,
+    SubmitField,
+)
 from wtforms.validators import DataRequired, Length
 
 
@@ -22,10 +29,24 @@ class ImportUsersForm(FlaskForm):
 class ImportStudentsForm(FlaskForm):
     upload = FileField(
         "请选择对应名单上传导入",
-        validators=[FileRequired(), FileAllowed(["xlsx"], "只允许上传xlsx文件!")],
+        validators=[
+            FileRequired(),
+            FileAllowed(["xlsx", "csv", "tsv", "txt"], "只允许上传xlsx、csv或tsv文件!"),
+        ],
+    )
+    mode = RadioField(
+        "导入方式",
+        choices=[
+            ("append", "追加导入"),
+            ("replace", "清除本校本学届现有考生后再导入"),
+            ("sync", "增量同步（按考号比对，只写入新增、修改和删除的考生）"),
+        ],
+        default="append",
     )
-    replace = BooleanField("清除本校本学届现有考生后再导入")
     not_divided = BooleanField("本次考试学生尚未分科")
+    dry_run = BooleanField(
+        "仅预览：完成校验并统计将要新增、修改和删除的行数，不写入数据库"
+    )
     submit = SubmitField("上传")
 
 
@@ -121,7 +142,21 @@ class EditTeacherForm(FlaskForm):
 class ImportTeachersForm(FlaskForm):
     upload = FileField(
         "请选择对应名单上传导入",
-        validators=[FileRequired(), FileAllowed(["xlsx"], "只允许上传xlsx文件!")],
+        validators=[
+            FileRequired(),
+            FileAllowed(["xlsx", "csv", "tsv", "txt"], "只允许上传xlsx、csv或tsv文件!"),
+        ],
+    )
+    mode = RadioField(
+        "导入方式",
+        choices=[
+            ("append", "追加导入"),
+            ("replace", "清除本校现有教师后再导入"),
+            ("sync", "增量同步（按编码比对，只写入新增、修改和删除的教师）"),
+        ],
+        default="append",
+    )
+    dry_run = BooleanField(
+        "仅预览：完成校验并统计将要新增、修改和删除的行数，不写入数据库"
     )
-    replace = BooleanField("清除本校现有教师后再导入")
     submit = SubmitField("上传")
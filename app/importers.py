@@ -0,0 +1,682 @@
+import codecs
+import csv
+import datetime
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from functools import partial
+
+import openpyxl
+import pandas as pd
+from sqlalchemy import and_, bindparam, func, select
+from werkzeug.security import generate_password_hash
+
+from app import app, db, logger
+from app.database import is_database_locked
+from app.models import Student, Teacher
+from app.pinyin import add_name_pinyin
+from app.stats import refresh_stats, subtract_stats
+from app.validation import VALID_SUBJECTS, validate_id_numbers, validate_students
+from app.versions import bump_version
+
+
+def cell_to_str(value):
+    """将单元格的值统一转换为去除首尾空白的字符串"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d")
+    return str(value).strip()
+
+
+# xlsx 为 zip 压缩包，旧版 xls 为 OLE 复合文档
+XLSX_MAGIC = b"PK\x03\x04"
+XLS_MAGIC = b"\xd0\xcf\x11\xe0"
+SNIFF_SIZE = 64 * 1024
+
+
+def read_table(file, chunk_size=None):
+    """流式读取上传的表格文件，根据文件开头的字节判断格式
+
+    支持 xlsx 以及 UTF-8 或 GBK 编码、逗号或制表符分隔的 csv/tsv 文件。
+    返回 (表头列表, 数据块迭代器)。每个数据块是一个所有值均为字符串的
+    DataFrame，索引为该行在文件中的行号，便于提示错误位置。
+    """
+    chunk_size = chunk_size or app.config["IMPORT_CHUNK_SIZE"]
+    # 遇到数据库锁重试时文件可能已被读过，总是从头读取
+    file.seek(0)
+    head = file.read(SNIFF_SIZE)
+    file.seek(0)
+    if head.startswith(XLSX_MAGIC):
+        return _read_xlsx(file, chunk_size)
+    if head.startswith(XLS_MAGIC):
+        raise ValueError("不支持旧版xls格式，请另存为xlsx或csv文件后上传")
+    return _read_csv(file, head, chunk_size)
+
+
+def _read_xlsx(file, chunk_size):
+    """以只读模式流式读取xlsx文件的第一个工作表，内存占用仅取决于块大小"""
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+
+    header = [cell_to_str(value) for value in next(rows, ())]
+    # 只读模式下工作表尺寸可能包含末尾的空列
+    while header and not header[-1]:
+        header.pop()
+    width = len(header)
+
+    def chunks():
+        try:
+            records, row_numbers = [], []
+            for row_num, row in enumerate(rows, start=2):
+                values = [cell_to_str(value) for value in row[:width]]
+                if not any(values):
+                    continue
+                values.extend([""] * (width - len(values)))
+                records.append(values)
+                row_numbers.append(row_num)
+                if len(records) >= chunk_size:
+                    yield pd.DataFrame(records, columns=header, index=row_numbers)
+                    records, row_numbers = [], []
+            if records:
+                yield pd.DataFrame(records, columns=header, index=row_numbers)
+        finally:
+            workbook.close()
+
+    return header, chunks()
+
+
+def _sniff_encoding(head):
+    """判断文本编码，带BOM或可按UTF-8解码的视为UTF-8，否则按GBK（GB18030）处理"""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # 采样末尾可能截断多字节字符，使用增量解码忽略不完整的结尾
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def _read_csv(file, head, chunk_size):
+    """使用 pandas 的C解析器分块读取csv/tsv文件，所有列均按字符串读取以保留前导零"""
+    encoding = _sniff_encoding(head)
+    first_line = head.decode(encoding, errors="ignore").splitlines()[:1] or [""]
+    separator = "\t" if first_line[0].count("\t") > first_line[0].count(",") else ","
+    header = next(csv.reader(first_line, delimiter=separator), [])
+    header = [name.strip() for name in header]
+
+    reader = pd.read_csv(
+        file,
+        sep=separator,
+        encoding=encoding,
+        dtype=str,
+        keep_default_na=False,
+        skip_blank_lines=False,
+        chunksize=chunk_size,
+        engine="c",
+    )
+
+    def chunks():
+        with reader:
+            for df in reader:
+                df.columns = header
+                df = df.fillna("").apply(lambda column: column.str.strip())
+                # 跳过空行，保留原始行号
+                df = df[(df != "").any(axis=1)]
+                # 索引从0开始且第1行为表头
+                df.index = df.index + 2
+                if not df.empty:
+                    yield df
+
+    return header, chunks()
+
+
+def bulk_insert(model, records, batch_size=None):
+    """以 executemany 方式批量插入记录，不经过ORM会话的对象跟踪
+
+    records 为字典列表，在当前事务中按批写入，返回插入的行数。
+    """
+    batch_size = batch_size or app.config["IMPORT_BATCH_SIZE"]
+    table = model.__table__
+    for start in range(0, len(records), batch_size):
+        db.session.execute(table.insert(), records[start : start + batch_size])
+    return len(records)
+
+
+def bulk_delete(model, *criteria, chunk_size=None, on_chunk=None):
+    """以带条件的 DELETE 语句删除记录，返回删除的行数
+
+    不指定 chunk_size 时在当前事务中执行单条语句，可与随后的导入一同提交或回滚；
+    指定时按主键分批删除并逐批提交，以缩短每次持有写锁的时间。
+    on_chunk 在每批删除前以该批的主键列表调用，其写入与这批删除一同提交。
+    """
+    table = model.__table__
+    if not chunk_size:
+        return db.session.execute(table.delete().where(*criteria)).rowcount
+
+    deleted = 0
+    while True:
+        ids = db.session.scalars(
+            select(table.c.id).where(*criteria).limit(chunk_size)
+        ).all()
+        if not ids:
+            return deleted
+        if on_chunk:
+            on_chunk(ids)
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < chunk_size:
+            return deleted
+
+
+def purge_roster(kind, *criteria, grade_name=None):
+    """管理员分批清除考生或教师，不指定条件时清除全部，返回删除的行数
+
+    每批删除与这批记录的统计扣减、数据版本递增一同提交，请求中途超时或失败时，
+    统计表和导出缓存与已删除的部分仍然一致。
+    """
+    model = {"students": Student, "teachers": Teacher}[kind]
+    grade_names = (grade_name,) if grade_name is not None else ()
+
+    def on_chunk(ids):
+        subtract_stats(kind, ids)
+        bump_version(kind, *grade_names)
+
+    return bulk_delete(
+        model,
+        *criteria,
+        chunk_size=app.config["DELETE_CHUNK_SIZE"],
+        on_chunk=on_chunk,
+    )
+
+
+def bulk_update(model, records, batch_size=None):
+    """按主键批量更新记录，records 为包含 _id 及待更新字段的字典列表"""
+    if not records:
+        return 0
+    batch_size = batch_size or app.config["IMPORT_BATCH_SIZE"]
+    table = model.__table__
+    statement = (
+        table.update()
+        .where(table.c.id == bindparam("_id"))
+        .values({field: bindparam(field) for field in records[0] if field != "_id"})
+    )
+    for start in range(0, len(records), batch_size):
+        db.session.execute(statement, records[start : start + batch_size])
+    return len(records)
+
+
+class SyncPlan:
+    """增量同步：按业务键比对上传数据与现有记录，只写入发生变化的行
+
+    创建时一次性读取范围内现有记录的键和待比对字段；之后每个数据块调用
+    apply() 写入新增和修改，全部数据块处理完后调用 finish() 删除文件中已不存在的记录。
+    dry_run 为真时只统计各类变更的行数，不执行任何写入。prepare 在写入前为新增和
+    修改的记录补上由比对字段派生的列，只对实际写入的行计算。
+    """
+
+    def __init__(self, model, key, fields, *criteria, dry_run=False, prepare=None):
+        self.model = model
+        self.key = key
+        self.fields = fields
+        self.dry_run = dry_run
+        self.prepare = prepare
+        table = model.__table__
+        rows = db.session.execute(
+            select(
+                table.c.id, table.c[key], *[table.c[field] for field in fields]
+            ).where(*criteria)
+        )
+        self.existing = {row[1]: (row[0], tuple(row[2:])) for row in rows}
+        self.inserted = self.updated = self.unchanged = self.deleted = 0
+
+    def apply(self, frame):
+        """比对一个数据块（DataFrame），只为新增和修改的行构造记录字典"""
+        keys = frame[self.key].tolist()
+        values = zip(*(frame[field].tolist() for field in self.fields))
+        insert_rows, updates = [], []
+        for position, (key, row_values) in enumerate(zip(keys, values)):
+            current = self.existing.pop(key, None)
+            if current is None:
+                insert_rows.append(position)
+            elif current[1] != row_values:
+                updates.append(
+                    {"_id": current[0], **dict(zip(self.fields, row_values))}
+                )
+            else:
+                self.unchanged += 1
+        if self.dry_run:
+            self.inserted += len(insert_rows)
+            self.updated += len(updates)
+            return
+        inserts = frame.iloc[insert_rows].to_dict("records")
+        if self.prepare:
+            self.prepare(inserts)
+            self.prepare(updates)
+        self.inserted += bulk_insert(self.model, inserts)
+        self.updated += bulk_update(self.model, updates)
+
+    def finish(self):
+        if self.dry_run:
+            self.deleted += len(self.existing)
+            self.existing = {}
+            return
+        table = self.model.__table__
+        ids = [current[0] for current in self.existing.values()]
+        batch_size = app.config["IMPORT_BATCH_SIZE"]
+        for start in range(0, len(ids), batch_size):
+            self.deleted += bulk_delete(
+                self.model, table.c.id.in_(ids[start : start + batch_size])
+            )
+        self.existing = {}
+
+    def summary(self):
+        return (
+            f"新增 {self.inserted} 行，修改 {self.updated} 行，"
+            f"删除 {self.deleted} 行，未变化 {self.unchanged} 行"
+        )
+
+
+@contextmanager
+def password_hash_pool(workers=None):
+    """为一次导入创建计算密码哈希的进程池，各数据块共用；进程数不大于1时返回 None
+
+    子进程以 spawn 方式启动：gunicorn 进程中还有后台导入线程，fork 多线程的进程
+    可能让子进程卡死在继承来的锁上。
+    """
+    workers = workers or app.config["PASSWORD_HASH_WORKERS"]
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        yield pool
+
+
+def hash_passwords(passwords, pool=None, method=None):
+    """计算一批密码的哈希值，结果顺序与输入一致；给定进程池时并行计算"""
+    method = method or app.config["PASSWORD_HASH_METHOD"]
+    hash_password = partial(generate_password_hash, method=method)
+    if pool is None or len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (app.config["PASSWORD_HASH_WORKERS"] * 4))
+    return list(pool.map(hash_password, passwords, chunksize=chunksize))
+
+
+class ImportTimer:
+    """统计导入行数与耗时，用于报告导入速度"""
+
+    def __init__(self):
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        rate = self.rows / self.elapsed if self.elapsed > 0 else 0
+        return f"共 {self.rows} 行，耗时 {self.elapsed:.2f} 秒（{rate:.0f} 行/秒）"
+
+
+def _report_dir():
+    report_dir = os.path.join(app.instance_path, "import_reports")
+    os.makedirs(report_dir, exist_ok=True)
+    return report_dir
+
+
+def save_error_report(errors):
+    """将错误记录保存为xlsx文件，返回用于下载的标识
+
+    同时清理一天前生成的旧报告。
+    """
+    report_dir = _report_dir()
+    expire_before = time.time() - 86400
+    for name in os.listdir(report_dir):
+        path = os.path.join(report_dir, name)
+        if os.path.getmtime(path) < expire_before:
+            os.remove(path)
+
+    token = uuid.uuid4().hex
+    errors.to_excel(error_report_path(token), index=False, engine="xlsxwriter")
+    return token
+
+
+def error_report_path(token):
+    """根据标识返回错误报告的文件路径"""
+    return os.path.join(_report_dir(), f"{token}.xlsx")
+
+
+class ImportFailed(Exception):
+    """导入失败，异常信息会原样展示给用户"""
+
+    def __init__(self, message, report_token=None):
+        super().__init__(message)
+        self.report_token = report_token
+
+
+def count_rows(model, *criteria):
+    """统计满足条件的行数"""
+    return db.session.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+def find_taken_keys(model, key, values, *exclude):
+    """返回 values 中已被数据库中其他记录占用的键
+
+    exclude 为本次导入会清除或同步的范围，范围内的现有记录不视为冲突。
+    """
+    column = model.__table__.c[key]
+    query = select(column).where(column.in_(values))
+    if exclude:
+        query = query.where(~and_(*exclude))
+    return set(db.session.scalars(query))
+
+
+@contextmanager
+def _import_transaction(dry_run=False):
+    """导入在单个事务中完成，成功时提交，任何失败都回滚
+
+    预览时不写入任何数据，结束后同样回滚，整个过程只是一个只读事务。
+    """
+    try:
+        yield
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except ImportFailed:
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        if is_database_locked(e):
+            raise  # 由调用方整体重试
+        raise ImportFailed(f"导入失败: {str(e)}") from e
+
+
+def _no_progress(phase, rows):
+    pass
+
+
+def _preview_summary(timer, sync_plan, inserted, removed):
+    """生成预览结果说明，inserted 和 removed 为非增量同步模式下的新增和清除行数"""
+    if sync_plan:
+        inserted, removed = sync_plan.inserted, sync_plan.deleted
+        updated, unchanged = sync_plan.updated, sync_plan.unchanged
+    else:
+        updated = unchanged = 0
+    return (
+        f"预览完成，未写入数据库。{timer.summary()}，导入后将新增 {inserted} 行，"
+        f"修改 {updated} 行，删除 {removed} 行，未变化 {unchanged} 行"
+    )
+
+
+def import_students(
+    file, user, mode="append", not_divided=False, dry_run=False, progress=None
+):
+    """导入考生名单，成功时返回结果说明，失败时抛出 ImportFailed
+
+    mode 为 append（追加）、replace（清除本校本学届后导入）或 sync（增量同步）。
+    dry_run 为真时完成全部解析、校验、查重和变更统计，但不写入数据库。
+    progress(phase, rows) 用于报告当前阶段和已处理行数。
+    """
+    progress = progress or _no_progress
+    progress("读取文件", 0)
+    try:
+        columns, chunks = read_table(file)
+    except Exception as e:
+        raise ImportFailed(f"读取文件失败: {str(e)}") from e
+
+    # 根据是否分科确定必需列
+    required_columns = ["姓名", "考号", "学校名称", "学届"]
+    if not not_divided:  # 如果已分科，则需要考生类型列
+        required_columns.append("考生类型")
+
+    # 检查必需列是否存在
+    missing_columns = set(required_columns) - set(columns)
+    if missing_columns:
+        raise ImportFailed(
+            f"缺少必需列: {', '.join(missing_columns)}。文件包含的列: {', '.join(columns)}"
+        )
+
+    removed = inserted = 0
+    sync_plan = None
+    scope = (
+        Student.school_name == user.school_name,
+        Student.grade_name == user.grade_name,
+    )
+    timer = ImportTimer()
+    # 导入中途失败时也立即关闭读取器，不留给垃圾回收在文件关闭后再执行
+    with _import_transaction(dry_run), closing(chunks):
+        if mode == "replace":
+            # 清理本校本学届现有学生，与导入在同一事务中
+            if dry_run:
+                removed = count_rows(Student, *scope)
+            else:
+                removed = bulk_delete(Student, *scope)
+        elif mode == "sync":
+            # 增量同步：按考号与本校本学届现有学生比对
+            sync_plan = SyncPlan(
+                Student,
+                "exam_no",
+                ["name", "class_name", "exam_type", "subject_type"],
+                *scope,
+                dry_run=dry_run,
+                prepare=add_name_pinyin,
+            )
+
+        # 按块整列校验并导入学生，出现错误后只继续校验，不再写入
+        error_frames = []
+        seen_exam_nos = set()
+        for df in chunks:
+            valid, errors = validate_students(df, user, not_divided, seen_exam_nos)
+
+            # 考号不能与其他学校或学届的考生重复，追加导入时也不能与本校现有考生重复
+            taken = find_taken_keys(
+                Student,
+                "exam_no",
+                valid["exam_no"].tolist(),
+                *(scope if mode != "append" else ()),
+            )
+            if taken:
+                clash = valid["exam_no"].isin(taken)
+                errors = pd.concat(
+                    [
+                        errors,
+                        pd.DataFrame(
+                            {
+                                "行号": valid.index[clash],
+                                "姓名": valid["name"][clash],
+                                "考号": valid["exam_no"][clash],
+                                "错误原因": "考号 '"
+                                + valid["exam_no"][clash]
+                                + "' 已被其他考生使用",
+                            }
+                        ),
+                    ]
+                ).sort_values("行号")
+                valid = valid[~clash]
+
+            if not errors.empty:
+                error_frames.append(errors)
+            if not error_frames:
+                # 追加、清除模式的预览只需行数，不构造待写入的记录
+                if sync_plan:
+                    sync_plan.apply(valid)
+                elif not dry_run:
+                    bulk_insert(Student, add_name_pinyin(valid.to_dict("records")))
+                inserted += len(valid)
+            timer.rows += len(df)
+            progress("校验并写入", timer.rows)
+
+        # 如果有错误记录，回滚并显示错误，完整错误报告可下载
+        if error_frames:
+            errors = pd.concat(error_frames)
+            # 只显示前10条错误，避免消息过长
+            error_display = "\n".join(
+                f"第{row['行号']}行: 学生 '{row['姓名']}' 的{row['错误原因']}"
+                for row in errors.head(10).to_dict("records")
+            )
+            if len(errors) > 10:
+                error_display += (
+                    f"\n...还有 {len(errors) - 10} 条错误未显示，请下载错误报告查看"
+                )
+            raise ImportFailed(
+                f"导入失败，以下数据有问题:\n{error_display}",
+                report_token=save_error_report(errors),
+            )
+
+        if sync_plan:
+            progress("删除文件中已不存在的考生", timer.rows)
+            sync_plan.finish()
+        if not dry_run:
+            bump_version("students", user.grade_name)
+            refresh_stats("students", user.school_name, user.grade_name)
+        progress("提交", timer.rows)
+
+    if dry_run:
+        return _preview_summary(timer, sync_plan, inserted, removed)
+
+    logger.info(f"{user.school_name}导入考生{timer.summary()}")
+    if sync_plan:
+        detail = sync_plan.summary()
+    else:
+        detail = f"清除原有考生 {removed} 人"
+    return f"考生导入成功，{timer.summary()}，{detail}"
+
+
+def import_teachers(file, user, mode="append", dry_run=False, progress=None):
+    """导入教师名单，成功时返回结果说明，失败时抛出 ImportFailed
+
+    mode 为 append（追加）、replace（清除本校后导入）或 sync（增量同步）。
+    dry_run 为真时完成全部解析、校验、查重和变更统计，但不写入数据库。
+    """
+    progress = progress or _no_progress
+    progress("读取文件", 0)
+    try:
+        columns, chunks = read_table(file)
+    except Exception as e:
+        raise ImportFailed(f"读取文件失败: {str(e)}") from e
+
+    # 检查必需列
+    required_columns = ["姓名", "身份证号", "任教学科", "学校名称", "任教学届"]
+    missing_columns = set(required_columns) - set(columns)
+    if missing_columns:
+        raise ImportFailed(f"缺少必需列: {', '.join(missing_columns)}")
+
+    removed = inserted = 0
+    sync_plan = None
+    scope = (Teacher.school_name == user.school_name,)
+    timer = ImportTimer()
+    # 导入中途失败时也立即关闭读取器，不留给垃圾回收在文件关闭后再执行
+    with _import_transaction(dry_run), closing(chunks):
+        if mode == "replace":
+            # 清理现有教师，与导入在同一事务中
+            if dry_run:
+                removed = count_rows(Teacher, *scope)
+            else:
+                removed = bulk_delete(Teacher, *scope)
+        elif mode == "sync":
+            # 增量同步：按编码与本校现有教师比对，角色、密码等手工维护的字段不覆盖
+            sync_plan = SyncPlan(
+                Teacher,
+                "code",
+                ["name", "teaching_grade", "subjects", "gender"],
+                *scope,
+                dry_run=dry_run,
+                prepare=add_name_pinyin,
+            )
+
+        # 按块批量导入教师
+        id_numbers = set()
+        for df in chunks:
+            # 检查身份证号是否有重复
+            if not df["身份证号"].is_unique or not id_numbers.isdisjoint(
+                df["身份证号"]
+            ):
+                raise ImportFailed("存在重复的身份证号，请检查后重新导入")
+            id_numbers.update(df["身份证号"])
+
+            # 检查学校名称
+            if (df["学校名称"] != user.school_name).any():
+                raise ImportFailed(
+                    "存在非本校教师或学校名称缺失或不匹配,请修正后重新导入"
+                )
+
+            # 整列校验身份证号，同时得到性别
+            id_numbers_ok, id_reasons, genders = validate_id_numbers(df["身份证号"])
+            if not id_numbers_ok.all():
+                invalid = id_reasons[~id_numbers_ok]
+                details = "；".join(
+                    f"第{row_num}行 '{df.at[row_num, '身份证号']}' {reason}"
+                    for row_num, reason in invalid.head(10).items()
+                )
+                raise ImportFailed(f"存在无效的身份证号，请检查后重新导入：{details}")
+
+            # 检查任教学科
+            if not df["任教学科"].isin(VALID_SUBJECTS).all():
+                raise ImportFailed("存在教师任教学科不正确,请修正后重新导入")
+
+            # 身份证号不能与其他学校的教师重复，追加导入时也不能与本校现有教师重复
+            taken = find_taken_keys(
+                Teacher,
+                "code",
+                df["身份证号"].tolist(),
+                *(scope if mode != "append" else ()),
+            )
+            if taken:
+                raise ImportFailed(
+                    f"以下身份证号已存在于系统中，请检查后重新导入：{', '.join(sorted(taken)[:10])}"
+                )
+
+            # 追加、清除模式的预览只需行数，不构造待写入的记录
+            if sync_plan or not dry_run:
+                teachers = pd.DataFrame(
+                    {
+                        "code": df["身份证号"],  # 使用身份证号作为编码
+                        "name": df["姓名"],
+                        "school_name": df["学校名称"],
+                        "teaching_grade": df["任教学届"],
+                        # 使用身份证号后6位作为密码
+                        "password": df["身份证号"].str[-6:],
+                        "subjects": df["任教学科"],
+                        "role": "任课教师",  # 默认角色
+                        "gender": genders,  # 根据身份证号判断性别
+                        "enabled": True,  # 默认启用
+                    }
+                )
+                if sync_plan:
+                    sync_plan.apply(teachers)
+                else:
+                    bulk_insert(Teacher, add_name_pinyin(teachers.to_dict("records")))
+            inserted += len(df)
+            timer.rows += len(df)
+            progress("校验并写入", timer.rows)
+
+        if sync_plan:
+            progress("删除文件中已不存在的教师", timer.rows)
+            sync_plan.finish()
+        if not dry_run:
+            # 清除或同步会删除本校各学届的教师，所有学届的教师版本一并递增
+            bump_version("teachers")
+            refresh_stats("teachers", user.school_name)
+        progress("提交", timer.rows)
+
+    if dry_run:
+        return _preview_summary(timer, sync_plan, inserted, removed)
+
+    logger.info(f"{user.school_name}导入教师{timer.summary()}")
+    if sync_plan:
+        detail = sync_plan.summary()
+    else:
+        detail = f"清除原有教师 {removed} 人"
+    return f"教师信息导入成功，{timer.summary()}，{detail}"
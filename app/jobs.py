@@ -0,0 +1,242 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, logger
+from app.database import is_database_locked, retry_on_lock
+from app.importers import ImportFailed, import_students, import_teachers
+from app.models import ImportJob, User
+
+IMPORTERS = {"students": import_students, "teachers": import_teachers}
+
+PHASES = {"pending": "排队中", "succeeded": "已完成", "failed": "失败"}
+
+# 每个 gunicorn 进程内的后台导入线程池，不依赖外部消息队列
+executor = ThreadPoolExecutor(
+    max_workers=app.config["IMPORT_WORKERS"], thread_name_prefix="import-job"
+)
+
+
+def _job_dir():
+    job_dir = os.path.join(app.instance_path, "import_jobs")
+    os.makedirs(job_dir, exist_ok=True)
+    return job_dir
+
+
+def _progress_path(job_id):
+    return os.path.join(_job_dir(), f"{job_id}.json")
+
+
+@retry_on_lock
+def _insert_job(**values):
+    job = ImportJob(**values)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def create_import_job(kind, file, user, options):
+    """保存上传文件并创建导入任务，交由后台线程池执行
+
+    上传流只能读取一次，文件只保存一次，遇到数据库锁时只重试插入任务行。
+    """
+    extension = os.path.splitext(file.filename)[1].lower()
+    file_path = os.path.join(_job_dir(), uuid.uuid4().hex + extension)
+    file.save(file_path)
+
+    try:
+        job = _insert_job(
+            user_id=user.id,
+            kind=kind,
+            filename=file.filename,
+            file_path=file_path,
+            options=options,
+            worker_pid=os.getpid(),
+        )
+    except Exception:
+        os.remove(file_path)
+        raise
+    executor.submit(run_import_job, job.id)
+    return job
+
+
+def _write_progress(job_id, phase, rows):
+    # 导入事务持有数据库写锁期间无法更新任务行，进度写入文件供各进程读取
+    path = _progress_path(job_id)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"phase": phase, "rows_processed": rows}, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def _remove_job_files(job):
+    for path in (job.file_path, _progress_path(job.id)):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _worker_alive(pid):
+    # 各 gunicorn 进程在同一台机器上，可用信号0检查进程是否存在
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_stale(job, now):
+    if job.worker_pid is None or not _worker_alive(job.worker_pid):
+        return True
+    return now - job.created_at > timedelta(seconds=app.config["IMPORT_JOB_TIMEOUT"])
+
+
+def _fail_stale_job(job, now):
+    # 排队中的任务尚未开始导入；运行中的任务可能已提交数据，只是结果没能记录
+    if job.status == "pending":
+        job.message = "导入任务因服务重启或超时而中断，数据未写入，请重新导入"
+    else:
+        job.message = (
+            "导入任务因服务重启或超时而中断，请核对名单数据后再决定是否重新导入"
+        )
+    job.status = "failed"
+    job.finished_at = now
+    _remove_job_files(job)
+    logger.warning(f"导入任务 {job.id} 已中断，标记为失败")
+
+
+def expire_stale_jobs():
+    """将执行进程已退出或超时的未完成任务标记为失败，并删除其上传文件
+
+    后台线程随 gunicorn 进程一同退出（部署、max-requests 重启、崩溃），
+    其中排队或运行的任务不会再被执行。
+    """
+    now = datetime.now()
+    jobs = db.session.scalars(
+        select(ImportJob).where(ImportJob.status.in_(("pending", "running")))
+    )
+    expired = 0
+    for job in jobs:
+        if _is_stale(job, now):
+            _fail_stale_job(job, now)
+            expired += 1
+    db.session.commit()
+    return expired
+
+
+def job_progress(job):
+    """返回任务的当前状态，运行中的任务合并进度文件中的阶段和行数"""
+    if not job.finished and _is_stale(job, datetime.now()):
+        # 执行任务的进程已退出，避免状态页面一直轮询
+        _fail_stale_job(job, datetime.now())
+        db.session.commit()
+    progress = {
+        "id": job.id,
+        "kind": job.kind,
+        "filename": job.filename,
+        "status": job.status,
+        "finished": job.finished,
+        "phase": PHASES.get(job.status, "运行中"),
+        "rows_processed": job.rows_processed or 0,
+        "message": job.message,
+        "has_report": bool(job.report_token),
+    }
+    if job.status == "running":
+        try:
+            with open(_progress_path(job.id), encoding="utf-8") as f:
+                progress.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return progress
+
+
+@retry_on_lock
+def _update_job(job_id, **values):
+    """更新任务行并立即提交，遇到其他导入持有的写锁时重试"""
+    job = db.session.get(ImportJob, job_id)
+    for name, value in values.items():
+        setattr(job, name, value)
+    db.session.commit()
+    return job
+
+
+def _finish_job(job_id, **values):
+    """记录任务结果，写锁被长时间占用时持续重试，直到写入成功或超过任务超时时间
+
+    放弃后任务会停在运行中，而执行它的进程仍存活，直到超时才会被标记为失败。
+    """
+    deadline = time.monotonic() + app.config["IMPORT_JOB_TIMEOUT"]
+    while True:
+        try:
+            return _update_job(job_id, **values)
+        except OperationalError as e:
+            db.session.rollback()
+            if not is_database_locked(e) or time.monotonic() >= deadline:
+                raise
+            logger.warning(f"导入任务 {job_id} 的结果暂时无法写入，稍后重试")
+            time.sleep(
+                app.config["DB_LOCK_BACKOFF"] * 2 ** app.config["DB_LOCK_RETRIES"]
+            )
+
+
+def run_import_job(job_id):
+    """在后台线程中执行导入任务，结束后记录结果并清理上传文件
+
+    线程池不会报告任务中的异常，这里捕获所有异常并记入日志，
+    保证任务总会以成功或失败结束，不会停留在排队或运行状态。
+    """
+    with app.app_context():
+        processed = {"rows": 0}
+        result = {"status": "failed", "message": None, "report_token": None}
+        try:
+            job = _update_job(job_id, status="running")
+            user = db.session.get(User, job.user_id)
+            kind, file_path, options = job.kind, job.file_path, job.options or {}
+
+            def progress(phase, rows):
+                processed["rows"] = rows
+                _write_progress(job_id, phase, rows)
+
+            @retry_on_lock
+            def run_importer():
+                with open(file_path, "rb") as f:
+                    return IMPORTERS[kind](f, user, progress=progress, **options)
+
+            try:
+                result.update(status="succeeded", message=run_importer())
+            except ImportFailed as e:
+                result.update(message=str(e), report_token=e.report_token)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"导入任务 {job_id} 执行出错")
+            result["message"] = f"导入失败: {str(e)}"
+
+        try:
+            job = _finish_job(
+                job_id,
+                rows_processed=processed["rows"],
+                finished_at=datetime.now(),
+                **result,
+            )
+            _remove_job_files(job)
+        except Exception:
+            db.session.rollback()
+            logger.exception(
+                f"导入任务 {job_id} 的结果未能写入任务表，结果为 {result['status']}"
+            )
+
+
+# 进程启动时清理此前进程遗留的任务；数据库尚未建表时跳过
+with app.app_context():
+    try:
+        expire_stale_jobs()
+    except OperationalError:
+        db.session.rollback()
@@ -1,7 +1,11 @@
+from datetime import datetime
+
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from app import db, login
+from app import app, db, login
+from app.pinyin import PINYIN_FIELDS, name_pinyin
 
 
 class User(db.Model, UserMixin):
@@ -13,8 +17,14 @@ class User(db.Model, UserMixin):
     school_name = db.Column(db.String(64))
     grade_name = db.Column(db.String(64))
 
+    @staticmethod
+    def hash_password(password):
+        return generate_password_hash(
+            password, method=app.config["PASSWORD_HASH_METHOD"]
+        )
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = self.hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -38,6 +48,57 @@ class Student(db.Model):
     exam_type = db.Column(db.String(64))
     exam_no = db.Column(db.String(64), unique=True)
     subject_type = db.Column(db.String(64))
+    # 姓名的全拼和拼音首字母，写入时计算，供拼音搜索按前缀查找
+    name_pinyin = db.Column(db.String(256))
+    name_initials = db.Column(db.String(64))
+    # 首字其他读音（多为姓氏读音，如 曾 zeng）的全拼和首字母，各以空格开头；没有时为空串
+    name_pinyin_variants = db.Column(db.String(512))
+
+    # 列表、搜索、同步和统计刷新都按学校+学届取一个分区，再按列表可选的排序列排序，
+    # 或按考生类型分组；导出和按学届清除只按学届筛选
+    __table_args__ = (
+        db.Index("ix_student_school_grade_name", "school_name", "grade_name", "name"),
+        db.Index(
+            "ix_student_school_grade_pinyin",
+            "school_name",
+            "grade_name",
+            "name_pinyin",
+        ),
+        db.Index(
+            "ix_student_school_grade_initials",
+            "school_name",
+            "grade_name",
+            "name_initials",
+        ),
+        db.Index(
+            "ix_student_school_grade_pinyin_variants",
+            "school_name",
+            "grade_name",
+            "name_pinyin_variants",
+        ),
+        db.Index(
+            "ix_student_school_grade_exam_type",
+            "school_name",
+            "grade_name",
+            "exam_type",
+        ),
+        db.Index(
+            "ix_student_school_grade_subject_type",
+            "school_name",
+            "grade_name",
+            "subject_type",
+        ),
+        db.Index(
+            "ix_student_school_grade_exam_no", "school_name", "grade_name", "exam_no"
+        ),
+        db.Index("ix_student_grade_name", "grade_name"),
+    )
+
+    @validates("name")
+    def _fill_name_pinyin(self, key, name):
+        for field, value in zip(PINYIN_FIELDS, name_pinyin(name)):
+            setattr(self, field, value)
+        return name
 
     def __repr__(self):
         return "<Student {}>".format(self.name)
@@ -54,6 +115,97 @@ class Teacher(db.Model):
     role = db.Column(db.String(20), nullable=False)
     gender = db.Column(db.String(10), nullable=True)
     enabled = db.Column(db.Boolean, default=True)
+    # 姓名的全拼和拼音首字母，写入时计算，供拼音搜索按前缀查找
+    name_pinyin = db.Column(db.String(256))
+    name_initials = db.Column(db.String(64))
+    # 首字其他读音（多为姓氏读音，如 曾 zeng）的全拼和首字母，各以空格开头；没有时为空串
+    name_pinyin_variants = db.Column(db.String(512))
+
+    # 列表和搜索按学校取教师并按列表可选的排序列排序；统计刷新按学校、学届、学科分组；
+    # 导出和按学届清除只按任教学届筛选
+    __table_args__ = (
+        db.Index("ix_teacher_school_name", "school_name", "name"),
+        db.Index("ix_teacher_school_pinyin", "school_name", "name_pinyin"),
+        db.Index("ix_teacher_school_initials", "school_name", "name_initials"),
+        db.Index(
+            "ix_teacher_school_pinyin_variants", "school_name", "name_pinyin_variants"
+        ),
+        db.Index(
+            "ix_teacher_school_grade_subjects",
+            "school_name",
+            "teaching_grade",
+            "subjects",
+        ),
+        # 按任教学届排序时上面的索引在学届相同的记录间按学科而不是主键排列
+        db.Index("ix_teacher_school_teaching_grade", "school_name", "teaching_grade"),
+        db.Index("ix_teacher_school_subjects", "school_name", "subjects"),
+        db.Index("ix_teacher_teaching_grade", "teaching_grade"),
+    )
+
+    @validates("name")
+    def _fill_name_pinyin(self, key, name):
+        for field, value in zip(PINYIN_FIELDS, name_pinyin(name)):
+            setattr(self, field, value)
+        return name
 
     def __repr__(self):
         return f"<Teacher {self.name}>"
+
+
+class ImportJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
+    kind = db.Column(db.String(20), nullable=False)  # students 或 teachers
+    filename = db.Column(db.String(256))
+    file_path = db.Column(db.String(512))
+    options = db.Column(db.JSON, default=dict)
+    # pending、running、succeeded、failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    rows_processed = db.Column(db.Integer, default=0)
+    message = db.Column(db.Text)
+    report_token = db.Column(db.String(64))
+    # 执行任务的进程号，进程重启后据此识别中断的任务
+    worker_pid = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def finished(self):
+        return self.status in ("succeeded", "failed")
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.kind} {self.status}>"
+
+
+class DataVersion(db.Model):
+    # 名单数据版本，每次写入考生、教师或用户时递增，用于判断缓存是否过期
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # students、teachers 或 users
+    grade_name = db.Column(db.String(64), nullable=False, default="")  # 空为全部学届
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (db.UniqueConstraint("scope", "grade_name"),)
+
+    def __repr__(self):
+        return f"<DataVersion {self.scope} {self.grade_name} {self.version}>"
+
+
+class SchoolGradeStats(db.Model):
+    # 按学校、学届预先汇总的人数，写入名单时同步刷新，统计页面只读此表
+    __tablename__ = "school_grade_stats"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # students 或 teachers
+    school_name = db.Column(db.String(128), nullable=False)
+    grade_name = db.Column(db.String(64), nullable=False, default="")
+    # 考生为考生类型，教师为任教学科
+    category = db.Column(db.String(128), nullable=False, default="")
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("kind", "school_name", "grade_name", "category"),
+    )
+
+    def __repr__(self):
+        return f"<SchoolGradeStats {self.kind} {self.school_name} {self.grade_name}>"
@@ -0,0 +1,47 @@
+import re
+from functools import lru_cache
+
+from pypinyin import Style, lazy_pinyin, pinyin
+
+# 拼音搜索用到的列，导入时与姓名一同写入和比对
+PINYIN_FIELDS = ("name_pinyin", "name_initials", "name_pinyin_variants")
+
+
+def _spell(readings):
+    # 非汉字部分原样保留，按字母数字切分，间隔号、空格等符号丢弃
+    syllables = re.findall(r"[0-9a-z]+", " ".join(readings).lower())
+    return "".join(syllables), "".join(syllable[0] for syllable in syllables)
+
+
+@lru_cache(maxsize=4096)
+def _readings(char):
+    """单个字的所有读音，不是汉字时为空"""
+    readings = pinyin(char, style=Style.NORMAL, heteronym=True, errors="ignore")
+    return tuple(readings[0]) if readings else ()
+
+
+# 同一批名单中重名很多，缓存转换结果避免重复查字典
+@lru_cache(maxsize=65536)
+def name_pinyin(name):
+    """返回姓名的全拼、拼音首字母和首字其他读音的拼音，全拼和首字母均为小写且不含分隔符
+
+    张三 -> (zhangsan, zs, "")，曾国藩 -> (cengguofan, cgf, " zengguofan zgf")。
+    """
+    name = name or ""
+    readings = lazy_pinyin(name)
+    full, initials = _spell(readings)
+    # 常用读音不一定是姓氏读音，如 曾、单、解、仇、查、区，首字的每个读音都收录
+    variants = []
+    for reading in _readings(name[:1]):
+        if reading != readings[0]:
+            variants.extend(_spell([reading, *readings[1:]]))
+    # 每个读音前加空格，可以用 LIKE '% 前缀%' 匹配其中任一个
+    variants = dict.fromkeys(v for v in variants if v not in (full, initials))
+    return full, initials, "".join(" " + variant for variant in variants)
+
+
+def add_name_pinyin(records):
+    """为待批量写入的记录字典补上 name_pinyin、name_initials 和 name_pinyin_variants"""
+    for record in records:
+        record.update(zip(PINYIN_FIELDS, name_pinyin(record["name"])))
+    return records
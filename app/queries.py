@@ -0,0 +1,214 @@
+import base64
+import json
+
+from sqlalchemy import and_, or_, select, true
+
+from app import app, db
+from app.models import Student, Teacher
+
+# 列表、搜索页面读取的列；只读页面以 Row 元组返回，不构造ORM对象，
+# 也不进入会话的身份映射和变更追踪
+STUDENT_ROW = (
+    Student.id,
+    Student.school_code,
+    Student.school_name,
+    Student.class_name,
+    Student.grade_name,
+    Student.name,
+    Student.exam_type,
+    Student.exam_no,
+    Student.subject_type,
+)
+
+TEACHER_ROW = (
+    Teacher.id,
+    Teacher.code,
+    Teacher.name,
+    Teacher.school_name,
+    Teacher.teaching_grade,
+    Teacher.password,
+    Teacher.subjects,
+    Teacher.role,
+    Teacher.gender,
+    Teacher.enabled,
+)
+
+# 列表页可选的排序列，翻页时再以主键区分排序值相同的记录
+STUDENT_SORTS = {
+    "name": Student.name,
+    "exam_type": Student.exam_type,
+    "subject_type": Student.subject_type,
+    "exam_no": Student.exam_no,
+}
+
+TEACHER_SORTS = {
+    "name": Teacher.name,
+    "teaching_grade": Teacher.teaching_grade,
+    "subjects": Teacher.subjects,
+}
+
+
+def stream_rows(query):
+    """以服务端游标分批读取查询结果，不构造ORM对象"""
+    result = db.session.execute(
+        query.execution_options(yield_per=app.config["EXPORT_BATCH_SIZE"])
+    )
+    yield from result
+
+
+class KeysetPage:
+    """按排序列和主键定位的一页，items 为 Row 元组
+
+    不计算总数也不使用 OFFSET，每页只从上一页末尾（或下一页开头）的位置向后读取
+    per_page 行，翻到多深的页代价都相同。游标对页面而言是不透明的字符串。
+    """
+
+    def __init__(self, items, sort_by, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.sort_by = sort_by
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(sort_by, direction, value, id):
+    payload = json.dumps([sort_by, direction, value, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_by):
+    """解析游标，返回 (方向, 排序列的值, 主键)；无效或属于其他排序方式时返回 None"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, direction, value, id = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+    if (
+        cursor_sort_by != sort_by
+        or direction not in ("next", "prev")
+        or not isinstance(id, int)
+        or not isinstance(value, (str, type(None)))
+    ):
+        return None
+    return direction, value, id
+
+
+def _segments(column, id_column, direction, value, id):
+    """游标之后（或之前）的记录，按读取顺序分成若干段，每段都能由索引定位和排序
+
+    升序时排序列为 NULL 的记录排在最前。若把 NULL 和非 NULL 两部分写成一个 OR 条件，
+    SQLite 无法在索引上直接定位到游标位置，只能从分区一端逐行扫描过去。
+    排序列不允许 NULL 时不生成只含 NULL 的段：SQLite 会认定这一段为空，
+    转而用其他索引读取整个分区再排序。
+    """
+    nullable = column.nullable
+    if direction == "next":
+        if value is None:
+            segments = [(column.is_not(None), (column, id_column))]
+            if nullable:
+                segments.insert(
+                    0, (and_(column.is_(None), id_column > id), (id_column,))
+                )
+            return segments
+        return [
+            (
+                and_(column >= value, or_(column > value, id_column > id)),
+                (column, id_column),
+            )
+        ]
+    if value is None:
+        if not nullable:
+            return []
+        return [(and_(column.is_(None), id_column < id), (id_column.desc(),))]
+    segments = [
+        (
+            and_(column <= value, or_(column < value, id_column < id)),
+            (column.desc(), id_column.desc()),
+        )
+    ]
+    if nullable:
+        segments.append((column.is_(None), (id_column.desc(),)))
+    return segments
+
+
+def keyset_page(query, model, sorts, sort_by, cursor=None, per_page=20):
+    """以 sort_by 对应的列加主键为键对查询分页，cursor 为上一页给出的游标"""
+    if sort_by not in sorts:
+        sort_by = "name"
+    column, id_column = sorts[sort_by], model.id
+    position = decode_cursor(cursor, sort_by) if cursor else None
+    if position:
+        direction = position[0]
+        segments = _segments(column, id_column, *position)
+    else:
+        direction = "next"
+        segments = [(true(), (column, id_column))]
+
+    # 多读一行以判断这个方向上是否还有下一页
+    items = []
+    for condition, order_by in segments:
+        remaining = per_page + 1 - len(items)
+        if remaining <= 0:
+            break
+        segment = query.where(condition).order_by(*order_by).limit(remaining)
+        items += db.session.execute(segment).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    def cursor_at(direction, row):
+        return encode_cursor(sort_by, direction, row._mapping[column], row.id)
+
+    if direction == "prev":
+        items.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = position is not None, has_more
+    return KeysetPage(
+        items,
+        sort_by,
+        next_cursor=cursor_at("next", items[-1]) if items and has_next else None,
+        prev_cursor=cursor_at("prev", items[0]) if items and has_prev else None,
+    )
+
+
+def student_page(school_name, grade_name, sort_by, cursor=None, per_page=20):
+    """本校本学届考生的一页"""
+    query = select(*STUDENT_ROW).where(
+        Student.school_name == school_name, Student.grade_name == grade_name
+    )
+    return keyset_page(query, Student, STUDENT_SORTS, sort_by, cursor, per_page)
+
+
+def teacher_page(school_name, sort_by, cursor=None, per_page=20):
+    """本校教师的一页"""
+    query = select(*TEACHER_ROW).where(Teacher.school_name == school_name)
+    return keyset_page(query, Teacher, TEACHER_SORTS, sort_by, cursor, per_page)
+
+
+def export_student_rows(columns, grade_name=None):
+    """按给定列流式读取导出用的考生，指定学届时只读取该学届"""
+    query = select(*columns)
+    if grade_name:
+        query = query.where(Student.grade_name == grade_name)
+    return stream_rows(query)
+
+
+def export_teacher_rows(columns, grade_name=None):
+    """按给定列流式读取导出用的教师，指定学届时只读取该学届"""
+    query = select(*columns)
+    if grade_name:
+        query = query.where(Teacher.teaching_grade == grade_name)
+    return stream_rows(query)
+
+
+def grade_has_exam_type(grade_name):
+    """该学届是否已分科，以第一名考生是否有考生类型为准"""
+    query = select(Student.exam_type).where(Student.grade_name == grade_name).limit(1)
+    return bool(db.session.scalar(query))
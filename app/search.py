@@ -0,0 +1,234 @@
+import re
+import threading
+
+from sqlalchemy import and_, column, literal_column, or_, select, table, union
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, logger
+from app.database import is_database_locked
+from app.importers import bulk_update
+from app.models import Student, Teacher
+from app.pinyin import PINYIN_FIELDS, name_pinyin
+from app.queries import STUDENT_ROW, TEACHER_ROW
+
+# 三元组分词至少需要3个字符，更短的搜索词改用 LIKE
+MIN_FTS_LENGTH = 3
+
+# 只由字母组成的搜索词按拼音或拼音首字母查找，如 zs、zhangsan、zhangs
+PINYIN_TERM = re.compile(r"[a-z]+")
+
+# 全文索引：(索引表, 名单表, 被索引的列)
+FTS_INDEXES = {
+    "student_fts": ("student", ("name", "exam_no")),
+    "teacher_fts": ("teacher", ("name", "code")),
+}
+
+_lock = threading.Lock()
+_fts_available = None
+
+
+def _index_ddl(fts_name, source, columns):
+    """建立外部内容的 FTS5 三元组索引及保持同步的触发器"""
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{col}" for col in columns)
+    old_values = ", ".join(f"old.{col}" for col in columns)
+    delete_old = (
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_name} USING fts5("
+        f"{cols}, content='{source}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {source} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {source} "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {cols} "
+        f"ON {source} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def rebuild_search_index():
+    """创建缺失的全文索引并从名单表重建，返回是否可用"""
+    global _fts_available
+    with _lock:
+        try:
+            with db.engine.begin() as connection:
+                for fts_name, (source, columns) in FTS_INDEXES.items():
+                    for statement in _index_ddl(fts_name, source, columns):
+                        connection.exec_driver_sql(statement)
+                    connection.exec_driver_sql(
+                        f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')"
+                    )
+            _fts_available = True
+        except OperationalError as e:
+            if is_database_locked(e):
+                # 只是暂时拿不到写锁，不能据此认定全文索引不可用
+                raise
+            # 数据库不是 SQLite，或 SQLite 未编译 FTS5 或不支持三元组分词
+            logger.warning(f"全文索引不可用，搜索将使用 LIKE: {e}")
+            _fts_available = False
+    return _fts_available
+
+
+def _ensure_search_index():
+    """首次搜索时检查全文索引及其触发器，缺少任何一个则创建并重建，每个进程只检查一次
+
+    SQLite 删除表时一并删除表上的触发器，迁移重建名单表后索引表仍在，
+    但不再随名单更新，必须同时检查触发器。
+    """
+    global _fts_available
+    if _fts_available is None:
+        if db.engine.dialect.name != "sqlite":
+            _fts_available = False
+            return False
+        names = [
+            name
+            for fts_name in FTS_INDEXES
+            for name in (fts_name, *(f"{fts_name}_{t}" for t in ("ai", "ad", "au")))
+        ]
+        quoted = ", ".join(f"'{name}'" for name in names)
+        with db.engine.connect() as connection:
+            existing = connection.exec_driver_sql(
+                f"SELECT count(*) FROM sqlite_master WHERE name IN ({quoted})"
+            ).scalar()
+        if existing == len(names):
+            _fts_available = True
+        else:
+            try:
+                rebuild_search_index()
+            except OperationalError as e:
+                if not is_database_locked(e):
+                    raise
+                # 其他进程正在写入，本次先用 LIKE，下次搜索再尝试建立索引
+                logger.warning(f"建立全文索引时数据库被锁，本次搜索使用 LIKE: {e}")
+                return False
+    return _fts_available
+
+
+def fill_name_pinyin(model, batch_size=None):
+    """为拼音列为空的记录补算拼音，用于升级后回填已有名单，返回补算的行数
+
+    没有其他读音的记录 name_pinyin_variants 为空串，为 NULL 说明还未计算过。
+    """
+    batch_size = batch_size or app.config["IMPORT_BATCH_SIZE"]
+    filled = 0
+    while True:
+        rows = db.session.execute(
+            select(model.id, model.name)
+            .where(
+                or_(model.name_pinyin.is_(None), model.name_pinyin_variants.is_(None))
+            )
+            .limit(batch_size)
+        ).all()
+        records = [
+            {"_id": id, **dict(zip(PINYIN_FIELDS, name_pinyin(name)))}
+            for id, name in rows
+        ]
+        filled += bulk_update(model, records)
+        db.session.commit()
+        if len(rows) < batch_size:
+            return filled
+
+
+def _prefix(column, prefix):
+    """以范围条件表达前缀匹配，可以使用索引，不受 LIKE 大小写规则的影响"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def _pinyin_query(model, row_columns, term, *scope):
+    """按全拼或拼音首字母的前缀查找，首字的其他读音也能匹配，如 zengg 找到 曾国藩
+
+    各条件分别查询再合并，保证各自使用对应的索引；若写成 OR 再按姓名排序，
+    未执行过 ANALYZE 的数据库会改用姓名索引扫描整个分区。
+    其他读音存成一个字符串，只能用 LIKE 逐条比较；加上不为空串的范围条件，
+    只在索引中比较本分区首字有多个读音的记录。
+    """
+    term = term.lower()
+    matches = union(
+        select(*row_columns).where(_prefix(model.name_pinyin, term), *scope),
+        select(*row_columns).where(_prefix(model.name_initials, term), *scope),
+        select(*row_columns).where(
+            model.name_pinyin_variants > " ",
+            model.name_pinyin_variants.like(f"% {term}%"),
+            *scope,
+        ),
+    ).subquery()
+    return select(matches).order_by(matches.c.name)
+
+
+def _fts_query(fts_name, model, row_columns, term, *scope):
+    """以三元组索引匹配搜索词，按 bm25 相关度排序并限制在用户的范围内"""
+    fts = table(fts_name, column("rowid"), column("rank"))
+    # 作为短语匹配，搜索词中的双引号需要转义
+    phrase = '"' + term.replace('"', '""') + '"'
+    return (
+        select(*row_columns)
+        .join(fts, fts.c.rowid == model.id)
+        .where(literal_column(fts_name).op("MATCH")(phrase), *scope)
+        .order_by(fts.c.rank, model.name)
+    )
+
+
+def _use_fts(term):
+    return len(term) >= MIN_FTS_LENGTH and _ensure_search_index()
+
+
+def search_students(term, school_name, grade_name):
+    """按姓名、拼音、拼音首字母或考号查找本校本学届考生"""
+    term = term.strip()
+    scope = (Student.school_name == school_name, Student.grade_name == grade_name)
+    if PINYIN_TERM.fullmatch(term.lower()):
+        query = _pinyin_query(Student, STUDENT_ROW, term, *scope)
+    elif _use_fts(term):
+        query = _fts_query("student_fts", Student, STUDENT_ROW, term, *scope)
+    else:
+        query = (
+            select(*STUDENT_ROW)
+            .where(
+                or_(
+                    Student.name.like(f"%{term}%"),
+                    Student.exam_no.like(f"%{term}%"),
+                ),
+                *scope,
+            )
+            .order_by(Student.name)
+        )
+    query = query.limit(app.config["SEARCH_RESULT_LIMIT"])
+    return db.session.execute(query).all()
+
+
+def search_teachers(term, school_name):
+    """按姓名、拼音、拼音首字母或身份证号查找本校教师"""
+    term = term.strip()
+    scope = (Teacher.school_name == school_name,)
+    if PINYIN_TERM.fullmatch(term.lower()):
+        query = _pinyin_query(Teacher, TEACHER_ROW, term, *scope)
+    elif _use_fts(term):
+        query = _fts_query("teacher_fts", Teacher, TEACHER_ROW, term, *scope)
+    else:
+        query = (
+            select(*TEACHER_ROW)
+            .where(
+                or_(
+                    Teacher.name.like(f"%{term}%"),
+                    Teacher.code.like(f"%{term}%"),
+                ),
+                *scope,
+            )
+            .order_by(Teacher.name)
+        )
+    query = query.limit(app.config["SEARCH_RESULT_LIMIT"])
+    return db.session.execute(query).all()
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # 全文索引的虚拟表及其影子表由本模块维护，不纳入 flask db migrate 的比对
+    if type_ == "table" and reflected and compare_to is None:
+        return not any(name.startswith(fts_name) for fts_name in FTS_INDEXES)
+    return True
+
+
+app.extensions["migrate"].configure_args["include_object"] = include_object
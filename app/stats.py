@@ -0,0 +1,265 @@
+from collections import defaultdict
+
+from sqlalchemy import delete, func, insert, or_, select, update
+
+from app import db
+from app.models import SchoolGradeStats, Student, Teacher, User
+from app.subjects import ELECTIVE_SUBJECTS, TEACHING_SUBJECT_KEYS, count_subjects
+
+
+# 统计表中各类名单的来源列：(学校, 学届, 分类)
+STATS_SOURCES = {
+    "students": (Student.school_name, Student.grade_name, Student.exam_type),
+    "teachers": (Teacher.school_name, Teacher.teaching_grade, Teacher.subjects),
+}
+
+
+def _grade_is(column, grade_name):
+    # 统计表以空字符串表示没有学届
+    if grade_name:
+        return column == grade_name
+    return or_(column == "", column.is_(None))
+
+
+def _source_counts(kind, school_name=None, grade_name=None):
+    """从名单表按学校、学届、分类分组计数，参数为 None 时不限"""
+    school_column, grade_column, category_column = STATS_SOURCES[kind]
+    # 直接按原始列分组才能由索引完成，空值在 Python 中并入空字符串
+    columns = (school_column, grade_column, category_column)
+    query = select(*columns, func.count()).group_by(*columns)
+    if school_name is not None:
+        query = query.where(school_column == school_name)
+    if grade_name is not None:
+        query = query.where(_grade_is(grade_column, grade_name))
+
+    counts = defaultdict(int)
+    for school, grade, category, count in db.session.execute(query):
+        counts[school, grade or "", category or ""] += count
+    return [(*key, count) for key, count in counts.items()]
+
+
+def refresh_stats(kind, school_name=None, grade_name=None):
+    """在当前事务中重新汇总统计表的一个分区，用于批量导入和删除
+
+    school_name、grade_name 为 None 时不限，例如清空全部数据后刷新整个类别。
+    """
+    criteria = [SchoolGradeStats.kind == kind]
+    if school_name is not None:
+        criteria.append(SchoolGradeStats.school_name == school_name)
+    if grade_name is not None:
+        criteria.append(SchoolGradeStats.grade_name == (grade_name or ""))
+    db.session.execute(delete(SchoolGradeStats).where(*criteria))
+
+    records = [
+        {
+            "kind": kind,
+            "school_name": school,
+            "grade_name": grade,
+            "category": category,
+            "count": count,
+        }
+        for school, grade, category, count in _source_counts(
+            kind, school_name, grade_name
+        )
+    ]
+    if records:
+        db.session.execute(insert(SchoolGradeStats), records)
+
+
+def adjust_stats(kind, school_name, grade_name, category, delta):
+    """在当前事务中按单条记录的增减调整统计表
+
+    用于新增、编辑和删除单个考生或教师，不重新扫描名单表。
+    """
+    key = (
+        SchoolGradeStats.kind == kind,
+        SchoolGradeStats.school_name == school_name,
+        SchoolGradeStats.grade_name == (grade_name or ""),
+        SchoolGradeStats.category == (category or ""),
+    )
+    result = db.session.execute(
+        update(SchoolGradeStats)
+        .where(*key)
+        .values(count=SchoolGradeStats.count + delta)
+    )
+    if not result.rowcount and delta > 0:
+        db.session.execute(
+            insert(SchoolGradeStats).values(
+                kind=kind,
+                school_name=school_name,
+                grade_name=grade_name or "",
+                category=category or "",
+                count=delta,
+            )
+        )
+    db.session.execute(
+        delete(SchoolGradeStats).where(*key, SchoolGradeStats.count <= 0)
+    )
+
+
+def subtract_stats(kind, ids):
+    """在当前事务中从统计表减去即将删除的记录，ids 为这些记录的主键"""
+    columns = STATS_SOURCES[kind]
+    model = columns[0].class_
+    query = select(*columns, func.count()).where(model.id.in_(ids)).group_by(*columns)
+    for school, grade, category, count in db.session.execute(query).all():
+        adjust_stats(kind, school, grade, category, -count)
+
+
+def rebuild_stats():
+    """清空统计表并从名单表全量重新汇总，返回写入的行数"""
+    for kind in STATS_SOURCES:
+        refresh_stats(kind)
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(SchoolGradeStats))
+
+
+def verify_stats():
+    """比对统计表与名单表的实时汇总
+
+    返回不一致的 (类别, 学校, 学届, 分类, 统计表人数, 实际人数) 列表。
+    """
+    stored = {
+        (kind, school, grade, category): count
+        for kind, school, grade, category, count in db.session.execute(
+            select(
+                SchoolGradeStats.kind,
+                SchoolGradeStats.school_name,
+                SchoolGradeStats.grade_name,
+                SchoolGradeStats.category,
+                SchoolGradeStats.count,
+            )
+        )
+    }
+    actual = {
+        (kind, school, grade, category): count
+        for kind in STATS_SOURCES
+        for school, grade, category, count in _source_counts(kind)
+    }
+    return [
+        (*key, stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(stored.keys() | actual.keys())
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+def _stats_counts(kind, grade_name=None):
+    """从统计表读取各校各分类人数，grade_name 为空时合计所有学届"""
+    query = select(
+        SchoolGradeStats.school_name,
+        SchoolGradeStats.category,
+        func.sum(SchoolGradeStats.count),
+    ).where(SchoolGradeStats.kind == kind)
+    if grade_name:
+        query = query.where(SchoolGradeStats.grade_name == grade_name)
+    query = query.group_by(SchoolGradeStats.school_name, SchoolGradeStats.category)
+    return db.session.execute(query)
+
+
+def school_total(kind, school_name, grade_name=None):
+    """从统计表读取一所学校的人数，考生限定学届，教师合计所有学届"""
+    query = select(func.sum(SchoolGradeStats.count)).where(
+        SchoolGradeStats.kind == kind, SchoolGradeStats.school_name == school_name
+    )
+    if kind == "students":
+        query = query.where(_grade_is(SchoolGradeStats.grade_name, grade_name))
+    return db.session.scalar(query) or 0
+
+
+def school_names():
+    """有账号的学校名称"""
+    query = select(User.school_name).where(User.school_name != "").distinct()
+    return sorted(db.session.scalars(query))
+
+
+def school_student_stats(grade_name=None):
+    """各校考生人数及各选考科目人数
+
+    读取统计表中按学校、考生类型汇总的人数，再按科目掩码汇总，
+    不扫描考生表。grade_name 为空时统计所有学届。
+    返回 (各校统计列表, 总计, 是否已分科)。
+    """
+    exam_type_counts = defaultdict(list)
+    for school_name, exam_type, count in _stats_counts("students", grade_name):
+        exam_type_counts[school_name].append((exam_type, count))
+
+    # 管理员查看所有学届时不区分科目
+    has_exam_type = bool(grade_name) and any(
+        exam_type for counts in exam_type_counts.values() for exam_type, _ in counts
+    )
+
+    total_stats = {"total": 0, **{key: 0 for key, _, _ in ELECTIVE_SUBJECTS}}
+    student_stats = []
+    for school_name in school_names():
+        counts = exam_type_counts.get(school_name, [])
+        school_stat = {
+            "school_name": school_name,
+            "student_count": sum(count for _, count in counts),
+        }
+        subject_counts = count_subjects(counts if has_exam_type else [])
+        for key, count in subject_counts.items():
+            school_stat[f"{key}_count"] = count
+            total_stats[key] += count
+
+        student_stats.append(school_stat)
+        total_stats["total"] += school_stat["student_count"]
+
+    return student_stats, total_stats, has_exam_type
+
+
+def school_teacher_stats(grade_name=None):
+    """各校教师人数及各任教学科人数
+
+    读取统计表中按学校、任教学科汇总的人数。grade_name 为空时统计所有学届。
+    返回 (各校统计列表, 总计)。
+    """
+    subject_keys = list(TEACHING_SUBJECT_KEYS.values())
+    school_counts = defaultdict(lambda: dict.fromkeys(["total", *subject_keys], 0))
+    for school_name, subjects, count in _stats_counts("teachers", grade_name):
+        counts = school_counts[school_name]
+        counts["total"] += count
+        # 不在学科列表中的教师只计入总人数
+        key = TEACHING_SUBJECT_KEYS.get(subjects)
+        if key:
+            counts[key] += count
+
+    total_stats = dict.fromkeys(["total", *subject_keys], 0)
+    teacher_stats = []
+    for school_name in school_names():
+        counts = school_counts[school_name]
+        school_stat = {"school_name": school_name, "teacher_count": counts["total"]}
+        for key in subject_keys:
+            school_stat[f"{key}_count"] = counts[key]
+        for key, count in counts.items():
+            total_stats[key] += count
+        teacher_stats.append(school_stat)
+
+    return teacher_stats, total_stats
+
+
+def grade_stats():
+    """各学届的考生和教师人数，学届取自非管理员账号"""
+    grades = db.session.scalars(
+        select(User.grade_name).where(User.is_admin.is_(False)).distinct()
+    )
+    grades = [grade for grade in grades if grade]  # 移除空值
+
+    grade_counts = {kind: {} for kind in STATS_SOURCES}
+    query = select(
+        SchoolGradeStats.kind,
+        SchoolGradeStats.grade_name,
+        func.sum(SchoolGradeStats.count),
+    ).group_by(SchoolGradeStats.kind, SchoolGradeStats.grade_name)
+    for kind, grade, count in db.session.execute(query):
+        grade_counts[kind][grade] = count
+
+    student_counts = grade_counts["students"]
+    teacher_counts = grade_counts["teachers"]
+    return [
+        {
+            "grade_name": grade,
+            "student_count": student_counts.get(grade, 0),
+            "teacher_count": teacher_counts.get(grade, 0),
+        }
+        for grade in grades
+    ]
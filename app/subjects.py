@@ -0,0 +1,68 @@
+from app.validation import VALID_EXAM_TYPES
+
+# 选考科目：(统计键, 科目名, 考生类型中代表该科目的字)，顺序即导出工作表和统计列的顺序
+ELECTIVE_SUBJECTS = [
+    ("physics", "物理", "物"),
+    ("chemistry", "化学", "化"),
+    ("biology", "生物", "生"),
+    ("history", "历史", "历"),
+    ("politics", "政治", "政"),
+    ("geography", "地理", "地"),
+]
+
+# 教师任教学科名称到统计键的对应关系
+TEACHING_SUBJECT_KEYS = {
+    "语文": "chinese",
+    "数学": "math",
+    "英语": "english",
+    **{name: key for key, name, _ in ELECTIVE_SUBJECTS},
+}
+
+SUBJECT_BITS = {
+    char: 1 << index for index, (_, _, char) in enumerate(ELECTIVE_SUBJECTS)
+}
+
+
+def _compute_mask(exam_type):
+    mask = 0
+    for char in exam_type or "":
+        mask |= SUBJECT_BITS.get(char, 0)
+    return mask
+
+
+# 12种有效考生类型的科目位掩码，只在启动时计算一次
+EXAM_TYPE_MASKS = {
+    exam_type: _compute_mask(exam_type) for exam_type in VALID_EXAM_TYPES
+}
+
+# 每个掩码包含的科目下标
+MASK_SUBJECTS = [
+    tuple(index for index in range(len(ELECTIVE_SUBJECTS)) if mask & (1 << index))
+    for mask in range(1 << len(ELECTIVE_SUBJECTS))
+]
+
+
+def subject_mask(exam_type):
+    """考生类型对应的科目位掩码，手工编辑过的非标准类型按字逐个判断"""
+    mask = EXAM_TYPE_MASKS.get(exam_type)
+    if mask is None:
+        mask = _compute_mask(exam_type)
+    return mask
+
+
+def subject_indexes(exam_type):
+    """考生类型所选科目在 ELECTIVE_SUBJECTS 中的下标"""
+    return MASK_SUBJECTS[subject_mask(exam_type)]
+
+
+def count_subjects(exam_type_counts):
+    """按考生类型人数汇总各科目人数
+
+    exam_type_counts 为 (考生类型, 人数) 的可迭代对象，逐个考生时人数为1。
+    返回以统计键为键的人数字典。
+    """
+    totals = [0] * len(ELECTIVE_SUBJECTS)
+    for exam_type, count in exam_type_counts:
+        for index in subject_indexes(exam_type):
+            totals[index] += count
+    return {key: total for (key, _, _), total in zip(ELECTIVE_SUBJECTS, totals)}
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+VALID_EXAM_TYPES = [
+    "物化生",
+    "物化政",
+    "物化地",
+    "物生地",
+    "物生政",
+    "物政地",
+    "历化政",
+    "历化生",
+    "历化地",
+    "历生政",
+    "历生地",
+    "历政地",
+]
+
+VALID_SUBJECTS = [
+    "语文",
+    "数学",
+    "英语",
+    "物理",
+    "化学",
+    "生物",
+    "政治",
+    "历史",
+    "地理",
+]
+
+
+# 身份证号前17位的加权因子及校验码（ISO 7064 MOD 11-2）
+ID_WEIGHTS = np.array([7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2])
+ID_CHECK_CODES = np.array([ord(code) for code in "10X98765432"])
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def validate_id_numbers(id_numbers):
+    """批量校验一整列身份证号
+
+    以 NumPy 数组一次完成长度、字符、出生日期和校验位的检查，不逐行循环。
+    返回 (是否合法, 不合法原因, 性别)，均为与输入索引一致的 Series，
+    不合法的行性别为空字符串。
+    """
+    values = id_numbers.astype(str).str.strip().str.upper()
+    length_ok = (values.str.len() == 18).to_numpy()
+
+    # 转为 (行数, 18) 的字符码矩阵，长度不对的行以占位值填充
+    padded = values.where(length_ok, "0" * 18).to_numpy(dtype="U18")
+    codes = padded.view(np.uint32).reshape(len(padded), 18).astype(np.int64)
+    digits = codes - ord("0")
+
+    body_ok = ((digits[:, :17] >= 0) & (digits[:, :17] <= 9)).all(axis=1)
+    last = codes[:, 17]
+    last_ok = ((last >= ord("0")) & (last <= ord("9"))) | (last == ord("X"))
+    chars_ok = length_ok & body_ok & last_ok
+
+    # 出生日期必须是真实存在且不晚于今天的日期
+    safe = np.where(chars_ok[:, None], digits, 0)
+    year = safe[:, 6:10] @ np.array([1000, 100, 10, 1])
+    month = safe[:, 10:12] @ np.array([10, 1])
+    day = safe[:, 12:14] @ np.array([10, 1])
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_ok = (month >= 1) & (month <= 12)
+    days = DAYS_IN_MONTH[np.clip(month, 1, 12) - 1] + ((month == 2) & leap)
+    today = pd.Timestamp.today()
+    birth = year * 10000 + month * 100 + day
+    date_ok = (
+        (year >= 1900)
+        & month_ok
+        & (day >= 1)
+        & (day <= days)
+        & (birth <= today.year * 10000 + today.month * 100 + today.day)
+    )
+
+    check_ok = ID_CHECK_CODES[(safe[:, :17] @ ID_WEIGHTS) % 11] == last
+
+    reasons = np.select(
+        [~length_ok, ~chars_ok, ~date_ok, ~check_ok],
+        ["长度不是18位", "包含无效字符", "出生日期无效", "校验位错误"],
+        default="",
+    )
+    valid = reasons == ""
+    genders = np.where(valid, np.where(safe[:, 16] % 2 == 1, "男", "女"), "")
+
+    index = id_numbers.index
+    return (
+        pd.Series(valid, index=index),
+        pd.Series(reasons, index=index, dtype=object),
+        pd.Series(genders, index=index, dtype=object),
+    )
+
+
+def _add_reason(reasons, mask, *parts):
+    """为 mask 命中的行追加一条错误原因
+
+    原因由 parts 中的字符串和列依次拼接而成，只对命中的行拼接；
+    数据通常全部有效，整列拼接再丢弃会占去校验的大部分时间。
+    """
+    if not mask.any():
+        return reasons
+    message = reasons[mask]
+    for part in parts:
+        message = message + (part[mask] if isinstance(part, pd.Series) else part)
+    reasons = reasons.copy()
+    reasons[mask] = message + "；"
+    return reasons
+
+
+def validate_students(df, user, not_divided, seen_exam_nos):
+    """按列对一个数据块的考生做整体校验
+
+    所有规则均以整列布尔掩码计算，不逐行循环。seen_exam_nos 为此前数据块
+    中已出现的考号集合，用于跨块查重，校验后会被更新。
+    返回 (可导入的考生记录, 错误记录)，两者均为 DataFrame。
+    """
+    names = df["姓名"]
+    exam_nos = df["考号"]
+    reasons = pd.Series("", index=df.index, dtype=object)
+
+    # 考号重复：块内重复及与此前数据块重复。逐个查集合，isin 每块都要把
+    # 不断增大的集合整体转换成数组，总耗时随行数平方增长
+    seen = exam_nos.map(seen_exam_nos.__contains__).astype(bool)
+    duplicated = exam_nos.duplicated(keep="first") | seen
+    reasons = _add_reason(reasons, duplicated, "考号 '", exam_nos, "' 重复")
+    seen_exam_nos.update(exam_nos)
+
+    school_names = df["学校名称"]
+    reasons = _add_reason(
+        reasons,
+        school_names != user.school_name,
+        "学校名称 '",
+        school_names,
+        f"' 与当前账号学校 '{user.school_name}' 不匹配",
+    )
+
+    grade_names = df["学届"]
+    reasons = _add_reason(
+        reasons,
+        grade_names != user.grade_name,
+        "学届 '",
+        grade_names,
+        f"' 与当前账号学届 '{user.grade_name}' 不匹配",
+    )
+
+    bad_exam_no = exam_nos.str.len() != 10
+    reasons = _add_reason(reasons, bad_exam_no, "考号 '", exam_nos, "' 不是10位数")
+
+    # 生成班级代码（学校代码 + 考号第3-4位）
+    class_names = str(user.school_code).zfill(1) + exam_nos.str[2:4]
+    reasons = _add_reason(
+        reasons,
+        ~bad_exam_no & (class_names.str.len() != 3),
+        "生成的班级代码 '",
+        class_names,
+        "' 不是3位数",
+    )
+
+    # 处理考生类型和科类属性
+    if not_divided:
+        exam_types = pd.Series("", index=df.index, dtype=object)
+        subject_types = exam_types
+    else:
+        exam_types = df["考生类型"]
+        reasons = _add_reason(
+            reasons,
+            ~exam_types.isin(VALID_EXAM_TYPES),
+            "考生类型 '",
+            exam_types,
+            "' 不在有效类型列表中",
+        )
+        subject_types = pd.Series(
+            np.where(exam_types.str.startswith("物"), "物理类", "历史类"),
+            index=df.index,
+        )
+
+    invalid = reasons != ""
+    errors = pd.DataFrame(
+        {
+            "行号": df.index[invalid],
+            "姓名": names[invalid],
+            "考号": exam_nos[invalid],
+            "错误原因": reasons[invalid].str.rstrip("；"),
+        }
+    )
+
+    valid = ~invalid
+    students = pd.DataFrame(
+        {
+            "school_code": str(user.school_code),
+            "school_name": user.school_name,
+            "grade_name": user.grade_name,
+            "class_name": class_names[valid],
+            "name": names[valid],
+            "exam_type": exam_types[valid],
+            "exam_no": exam_nos[valid],
+            "subject_type": subject_types[valid],
+        }
+    )
+    return students, errors
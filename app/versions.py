@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import DataVersion
+
+# 空学届对应全部学届，任一学届的数据变化都会使其版本递增
+ALL_GRADES = ""
+
+
+def bump_version(scope, *grade_names):
+    """在当前事务中递增数据版本，随写入一起提交
+
+    指定学届时递增这些学届及全部学届的版本；不指定时递增该范围内的所有版本，
+    用于清空全部数据等无法按学届区分的写入。
+    """
+    now = datetime.now()
+    if not grade_names:
+        db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.scope == scope)
+            .values(version=DataVersion.version + 1, updated_at=now)
+        )
+        return
+
+    grade_names = {grade_name or ALL_GRADES for grade_name in grade_names}
+    for grade_name in grade_names | {ALL_GRADES}:
+        result = db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.scope == scope, DataVersion.grade_name == grade_name)
+            .values(version=DataVersion.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            db.session.add(
+                DataVersion(scope=scope, grade_name=grade_name, updated_at=now)
+            )
+    db.session.flush()
+
+
+def current_version(scope, grade_name=None):
+    """返回某学届数据的当前版本，不存在时创建
+
+    版本行必须先于缓存存在，清空全部数据时才能一并使其失效。
+    """
+    grade_name = grade_name or ALL_GRADES
+    query = select(DataVersion).where(
+        DataVersion.scope == scope, DataVersion.grade_name == grade_name
+    )
+    version = db.session.scalar(query)
+    if version is None:
+        try:
+            version = DataVersion(scope=scope, grade_name=grade_name)
+            db.session.add(version)
+            db.session.commit()
+        except IntegrityError:
+            # 其他进程同时创建了同一版本行
+            db.session.rollback()
+            version = db.session.scalar(query)
+    return version
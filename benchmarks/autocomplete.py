@@ -0,0 +1,106 @@
+"""比较输入联想的内存前缀索引与每次查询数据库的拼音前缀搜索的耗时
+
+模拟逐字输入拼音，每输入一个字母查找一次。在临时数据库中写入测试数据，
+不读写应用的数据库。
+
+用法: python benchmarks/autocomplete.py [行数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 须在导入应用前指定，应用启动时按此建立数据库连接
+_database_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_database_dir.name, "bench.db")
+
+from sqlalchemy import select
+
+from app import app, db
+from app.autocomplete import SOURCES, PrefixIndex
+from app.importers import bulk_insert
+from app.models import Student
+from app.pinyin import add_name_pinyin
+from app.search import search_students
+
+SCHOOL_NAME, GRADE_NAME = "一中", "基准测试"
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何林罗高"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰"
+TYPED = ["zhangwei", "lfang", "chenj", "zs", "wangxiuying"]
+
+
+def make_students(count):
+    return add_name_pinyin(
+        [
+            {
+                "school_code": "1",
+                "school_name": SCHOOL_NAME,
+                "grade_name": GRADE_NAME,
+                "class_name": "101",
+                "name": random.choice(SURNAMES)
+                + "".join(random.choices(GIVEN, k=random.randint(1, 2))),
+                "exam_type": "物化生",
+                "exam_no": f"B{i:09d}",
+                "subject_type": "物理类",
+            }
+            for i in range(count)
+        ]
+    )
+
+
+def time_keystrokes(lookup):
+    started = time.perf_counter()
+    keystrokes = 0
+    for word in TYPED:
+        for end in range(1, len(word) + 1):
+            lookup(word[:end])
+            keystrokes += 1
+    return (time.perf_counter() - started) / keystrokes
+
+
+def build_index():
+    _, columns, key_columns = SOURCES["students"]
+    rows = db.session.execute(
+        select(*columns, *key_columns).where(
+            Student.school_name == SCHOOL_NAME, Student.grade_name == GRADE_NAME
+        )
+    ).all()
+    return PrefixIndex(
+        [dict(zip(row._fields[: len(columns)], row[: len(columns)])) for row in rows],
+        [row[len(columns) :] for row in rows],
+    )
+
+
+def benchmark(count):
+    with app.app_context():
+        db.create_all()
+        bulk_insert(Student, make_students(count))
+        db.session.commit()
+
+        started = time.perf_counter()
+        index = build_index()
+        print(f"行数: {count}，建立内存索引耗时 {time.perf_counter() - started:.3f} 秒")
+
+        # 数据库搜索也只取联想的条数，两者返回的结果数相同
+        limit = app.config["SEARCH_RESULT_LIMIT"] = app.config["AUTOCOMPLETE_LIMIT"]
+        lookups = {
+            "数据库拼音搜索": lambda term: search_students(
+                term, SCHOOL_NAME, GRADE_NAME
+            ),
+            "内存前缀索引": lambda term: index.lookup(term, limit),
+        }
+        baseline = None
+        for name, lookup in lookups.items():
+            per_key = time_keystrokes(lookup)
+            baseline = baseline or per_key
+            print(
+                f"{name:<8} 每次按键 {per_key * 1e6:9.1f} 微秒，"
+                f"加速比 {baseline / per_key:.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,80 @@
+"""比较读取考生时构造ORM对象与按列投影返回Row元组的耗时
+
+在临时数据库中写入测试数据，不读写应用的数据库。
+
+用法: python benchmarks/hydration.py [行数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 须在导入应用前指定，应用启动时按此建立数据库连接
+_database_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_database_dir.name, "bench.db")
+
+from sqlalchemy import select
+
+from app import app, db
+from app.importers import bulk_insert
+from app.models import Student
+from app.queries import STUDENT_ROW
+
+GRADE_NAME = "基准测试"
+
+
+def make_students(count):
+    return [
+        {
+            "school_code": "1",
+            "school_name": "一中",
+            "grade_name": GRADE_NAME,
+            "class_name": "101",
+            "name": f"学生{i}",
+            "exam_type": "物化生",
+            "exam_no": f"B{i:09d}",
+            "subject_type": "物理类",
+        }
+        for i in range(count)
+    ]
+
+
+def time_load(load):
+    db.session.expire_all()
+    started = time.perf_counter()
+    rows = load()
+    elapsed = time.perf_counter() - started
+    # 模拟模板逐行读取各字段
+    for row in rows:
+        row.name, row.exam_no, row.class_name
+    return len(rows), elapsed
+
+
+def benchmark(count):
+    with app.app_context():
+        db.create_all()
+        bulk_insert(Student, make_students(count))
+        db.session.commit()
+
+        loaders = {
+            "ORM对象": lambda: Student.query.filter_by(grade_name=GRADE_NAME).all(),
+            "列投影Row": lambda: db.session.execute(
+                select(*STUDENT_ROW).where(Student.grade_name == GRADE_NAME)
+            ).all(),
+        }
+        print(f"行数: {count}")
+        baseline = None
+        for name, load in loaders.items():
+            rows, elapsed = time_load(load)
+            per_10k = elapsed / rows * 10000
+            baseline = baseline or per_10k
+            print(
+                f"{name:<8} 读取 {rows} 行耗时 {elapsed:6.3f} 秒，"
+                f"每万行 {per_10k * 1000:7.1f} 毫秒，加速比 {baseline / per_10k:.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,101 @@
+"""比较列表按页码分页（COUNT + OFFSET）与按游标分页在不同深度的每页耗时
+
+在临时数据库中写入测试数据，不读写应用的数据库。
+
+用法: python benchmarks/pagination.py [行数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 须在导入应用前指定，应用启动时按此建立数据库连接
+_database_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_database_dir.name, "bench.db")
+
+from sqlalchemy import func, select
+
+from app import app, db
+from app.importers import bulk_insert
+from app.models import Student
+from app.pinyin import add_name_pinyin
+from app.queries import STUDENT_ROW, encode_cursor, student_page
+
+SCHOOL_NAME, GRADE_NAME = "一中", "基准测试"
+PER_PAGE = 20
+REPEAT = 20
+
+
+def make_students(count):
+    return add_name_pinyin(
+        [
+            {
+                "school_code": "1",
+                "school_name": SCHOOL_NAME,
+                "grade_name": GRADE_NAME,
+                "class_name": "101",
+                "name": f"学生{random.randrange(count):07d}",
+                "exam_type": "物化生",
+                "exam_no": f"B{i:09d}",
+                "subject_type": "物理类",
+            }
+            for i in range(count)
+        ]
+    )
+
+
+def offset_page(page):
+    """原先的分页方式：每页先 COUNT 再 OFFSET"""
+    query = select(*STUDENT_ROW).where(
+        Student.school_name == SCHOOL_NAME, Student.grade_name == GRADE_NAME
+    )
+    db.session.scalar(select(func.count()).select_from(query.subquery()))
+    offset = (page - 1) * PER_PAGE
+    return db.session.execute(
+        query.order_by(Student.name).limit(PER_PAGE).offset(offset)
+    ).all()
+
+
+def time_page(load):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        load()
+    return (time.perf_counter() - started) / REPEAT
+
+
+def benchmark(count):
+    with app.app_context():
+        db.create_all()
+        bulk_insert(Student, make_students(count))
+        db.session.commit()
+        ordered = db.session.execute(
+            select(Student.id, Student.name)
+            .where(Student.grade_name == GRADE_NAME)
+            .order_by(Student.name, Student.id)
+        ).all()
+
+        print(f"行数: {count}，每页 {PER_PAGE} 行")
+        pages = count // PER_PAGE
+        for page in (1, pages // 10, pages // 2, pages):
+            page = max(page, 1)
+            # 游标取自上一页最后一行，与逐页点击“下一页”得到的相同
+            cursor = None
+            if page > 1:
+                row = ordered[(page - 1) * PER_PAGE - 1]
+                cursor = encode_cursor("name", "next", row.name, row.id)
+            by_offset = time_page(lambda: offset_page(page))
+            by_cursor = time_page(
+                lambda: student_page(SCHOOL_NAME, GRADE_NAME, "name", cursor)
+            )
+            print(
+                f"第 {page:>6} 页  页码分页 {by_offset * 1000:7.2f} 毫秒，"
+                f"游标分页 {by_cursor * 1000:7.2f} 毫秒，"
+                f"加速比 {by_offset / by_cursor:.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
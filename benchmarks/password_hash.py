@@ -0,0 +1,38 @@
+"""比较不同进程数下批量计算密码哈希的速度
+
+用法: python benchmarks/password_hash.py [账号数量]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from app.importers import hash_passwords, password_hash_pool
+
+
+def benchmark(count):
+    passwords = [f"password{i}" for i in range(count)]
+    method = app.config["PASSWORD_HASH_METHOD"]
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpu_count} & set(range(1, cpu_count + 1)))
+
+    print(f"哈希算法: {method}，账号数量: {count}")
+    baseline = None
+    for workers in worker_counts:
+        started = time.perf_counter()
+        # 计时包含进程池的启动，与一次导入的实际开销相同
+        with password_hash_pool(workers) as pool:
+            hash_passwords(passwords, pool, method=method)
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed
+        baseline = baseline or rate
+        print(
+            f"进程数 {workers:>2}: 耗时 {elapsed:6.2f} 秒，"
+            f"{rate:7.1f} 个/秒，加速比 {rate / baseline:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
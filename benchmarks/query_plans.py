@@ -0,0 +1,242 @@
+"""检查列表、搜索、统计刷新和导出的查询是否走索引
+
+在临时数据库中按当前模型建表，调用应用中生成这些查询的函数，记录它们实际执行的语句，
+逐条执行 EXPLAIN QUERY PLAN，断言不出现全表扫描，需要时也断言排序由索引完成。
+有不符合的查询时以非零状态退出。
+
+用法: python benchmarks/query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 须在导入应用前指定，应用启动时按此建立数据库连接
+_database_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_database_dir.name, "plans.db")
+
+from sqlalchemy import event
+
+from app import app, db
+from app.exporters import STUDENT_COLUMNS, TEACHER_COLUMNS
+from app.importers import purge_roster
+from app.models import Student, Teacher
+from app.queries import (
+    encode_cursor,
+    export_student_rows,
+    export_teacher_rows,
+    STUDENT_SORTS,
+    student_page,
+    TEACHER_SORTS,
+    teacher_page,
+)
+from app.search import search_students, search_teachers
+from app.stats import _source_counts
+
+SCHOOL, GRADE = "一中", "2024届"
+
+# 列表每种排序方式应使用的索引，排序列和主键的顺序都要由索引给出
+STUDENT_SORT_INDEXES = {
+    "name": "ix_student_school_grade_name",
+    "exam_type": "ix_student_school_grade_exam_type",
+    "subject_type": "ix_student_school_grade_subject_type",
+    "exam_no": "ix_student_school_grade_exam_no",
+}
+TEACHER_SORT_INDEXES = {
+    "name": "ix_teacher_school_name",
+    "teaching_grade": "ix_teacher_school_teaching_grade",
+    "subjects": "ix_teacher_school_subjects",
+}
+
+
+def export_students():
+    return list(export_student_rows([column for _, column in STUDENT_COLUMNS], GRADE))
+
+
+def export_teachers():
+    return list(export_teacher_rows([column for _, column in TEACHER_COLUMNS], GRADE))
+
+
+# 按学届清除时的条件与管理页面相同；先写入一条待清除的记录，
+# 使每批的统计扣减和删除语句也得到检查
+def purge_students():
+    db.session.add(Student(school_name=SCHOOL, grade_name=GRADE, name="张三"))
+    db.session.commit()
+    return purge_roster("students", Student.grade_name == GRADE, grade_name=GRADE)
+
+
+def purge_teachers():
+    db.session.add(
+        Teacher(
+            code="1",
+            name="张三",
+            school_name=SCHOOL,
+            teaching_grade=GRADE,
+            password="",
+            role="",
+        )
+    )
+    db.session.commit()
+    return purge_roster("teachers", Teacher.teaching_grade == GRADE, grade_name=GRADE)
+
+
+def page_cases(label, page, sorts, sort_indexes):
+    """列表每种可选排序的首页、向后翻页和向前翻页，游标的排序值分为空和非空两种"""
+    cases = []
+    for sort_by in sorts:
+        # 索引名后补空格，避免与以它为前缀的其他索引名混淆
+        index = sort_indexes[sort_by] + " "
+        cursors = [("首页", None)] + [
+            (
+                f"{'向后' if direction == 'next' else '向前'}翻页"
+                f"（排序值{'为空' if value is None else '非空'}）",
+                encode_cursor(sort_by, direction, value, 100),
+            )
+            for direction in ("next", "prev")
+            # 不允许 NULL 的列不会出现排序值为空的游标
+            for value in ("张三", None)[: 2 if sorts[sort_by].nullable else 1]
+        ]
+        for name, cursor in cursors:
+            cases.append(
+                (
+                    f"{label}按 {sort_by} 排序{name}",
+                    lambda sort_by=sort_by, cursor=cursor: page(sort_by, cursor),
+                    index,
+                    True,
+                )
+            )
+    return cases
+
+
+# (说明, 发出查询的调用, 期望使用的索引, 是否要求由索引完成排序)
+# 期望的索引可以是一个元组，此时每个索引都必须用到
+CASES = [
+    *page_cases(
+        "考生列表",
+        lambda sort_by, cursor: student_page(SCHOOL, GRADE, sort_by, cursor),
+        STUDENT_SORTS,
+        STUDENT_SORT_INDEXES,
+    ),
+    # 短搜索词回退到 LIKE 时只能按学校+学届定位分区，使用任一分区索引均可
+    (
+        "考生短词搜索",
+        lambda: search_students("张", SCHOOL, GRADE),
+        "ix_student_school_grade_",
+        False,
+    ),
+    (
+        "考生拼音搜索",
+        lambda: search_students("zs", SCHOOL, GRADE),
+        (
+            "ix_student_school_grade_pinyin ",
+            "ix_student_school_grade_initials",
+            "ix_student_school_grade_pinyin_variants",
+        ),
+        False,
+    ),
+    (
+        "考生统计分区刷新",
+        lambda: _source_counts("students", SCHOOL, GRADE),
+        "ix_student_school_grade_exam_type",
+        True,
+    ),
+    ("按学届导出考生", export_students, "ix_student_grade_name", False),
+    ("按学届清除考生", purge_students, "ix_student_grade_name", False),
+    *page_cases(
+        "教师列表",
+        lambda sort_by, cursor: teacher_page(SCHOOL, sort_by, cursor),
+        TEACHER_SORTS,
+        TEACHER_SORT_INDEXES,
+    ),
+    (
+        "教师短词搜索",
+        lambda: search_teachers("张", SCHOOL),
+        "ix_teacher_school_",
+        False,
+    ),
+    (
+        "教师拼音搜索",
+        lambda: search_teachers("zs", SCHOOL),
+        (
+            "ix_teacher_school_pinyin ",
+            "ix_teacher_school_initials",
+            "ix_teacher_school_pinyin_variants",
+        ),
+        False,
+    ),
+    (
+        "教师统计分区刷新",
+        lambda: _source_counts("teachers", SCHOOL),
+        "ix_teacher_school_grade_subjects",
+        True,
+    ),
+    ("按学届导出教师", export_teachers, "ix_teacher_teaching_grade", False),
+    ("按学届清除教师", purge_teachers, "ix_teacher_teaching_grade", False),
+]
+
+
+def executed_statements(call):
+    """执行 call，返回其间发往数据库的查询和删除语句及参数"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return statements
+
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in rows]
+
+
+def check(name, call, indexes, sorted_by_index):
+    if isinstance(indexes, str):
+        indexes = (indexes,)
+    plans = [query_plan(*statement) for statement in executed_statements(call)]
+    steps = [step for plan in plans for step in plan]
+    problems = []
+    if not plans:
+        problems.append("没有执行任何查询")
+    for index in indexes:
+        # 索引名后跟空格或括号，补一个空格以便区分互为前缀的索引名
+        if not any(index in step + " " for step in steps):
+            problems.append(f"未使用索引 {index.strip()}")
+    # 只检查名单表本身，UNION 等子查询的结果集逐行读取是正常的
+    if any(
+        step.startswith("SCAN ") and step.split()[1] in db.metadata.tables
+        for step in steps
+    ):
+        problems.append("存在全表扫描")
+    if sorted_by_index and any("TEMP B-TREE" in step for step in steps):
+        problems.append("排序或分组未由索引完成")
+
+    print(f"{'通过' if not problems else '失败'}  {name}")
+    for number, plan in enumerate(plans):
+        if number:
+            print("      --")
+        for step in plan:
+            print(f"      {step}")
+    for problem in problems:
+        print(f"      !! {problem}")
+    return not problems
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        results = [check(*case) for case in CASES]
+    print(f"\n{sum(results)}/{len(results)} 项通过")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
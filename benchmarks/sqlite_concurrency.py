@@ -0,0 +1,145 @@
+"""比较默认回滚日志模式与配置的 SQLite PRAGMA 在并发读写下的吞吐量
+
+在临时数据库中模拟多个 gunicorn 进程：若干进程持续分页读取考生列表，
+若干进程持续以大事务批量写入考生，统计每秒读写次数和锁错误数。
+
+用法: python benchmarks/sqlite_concurrency.py [秒数] [读进程数] [写进程数]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, event, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app import app, db
+from app.database import apply_pragmas
+from app.models import Student
+from app.queries import STUDENT_ROW
+
+SCHOOLS = [f"学校{i}" for i in range(20)]
+GRADE_NAME = "2024届"
+BATCH_SIZE = 1000
+
+PROFILES = {
+    # 未做任何配置时 SQLite 的默认行为，Python 驱动默认等待写锁5秒
+    "默认（回滚日志）": {"journal_mode": "delete", "synchronous": "full"},
+    "配置的PRAGMA": app.config["SQLITE_PRAGMAS"],
+}
+
+
+def make_engine(path, pragmas):
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(
+        engine, "connect", lambda connection, _: apply_pragmas(connection, pragmas)
+    )
+    return engine
+
+
+def make_students(prefix, count):
+    return [
+        {
+            "school_code": "1",
+            "school_name": random.choice(SCHOOLS),
+            "grade_name": GRADE_NAME,
+            "class_name": "101",
+            "name": f"学生{prefix}{i}",
+            "exam_type": "物化生",
+            "exam_no": f"{prefix}{i:08d}",
+            "subject_type": "物理类",
+        }
+        for i in range(count)
+    ]
+
+
+def reader(path, pragmas, duration):
+    engine = make_engine(path, pragmas)
+    done = errors = 0
+    deadline = time.perf_counter() + duration
+    with engine.connect() as connection:
+        while time.perf_counter() < deadline:
+            query = (
+                select(*STUDENT_ROW)
+                .where(
+                    Student.school_name == random.choice(SCHOOLS),
+                    Student.grade_name == GRADE_NAME,
+                )
+                .order_by(Student.name)
+                .limit(20)
+                .offset(random.randrange(0, 200))
+            )
+            try:
+                connection.execute(query).all()
+                connection.commit()
+                done += 1
+            except OperationalError:
+                connection.rollback()
+                errors += 1
+    return "read", done, errors
+
+
+def writer(path, pragmas, duration, worker):
+    engine = make_engine(path, pragmas)
+    done = errors = 0
+    deadline = time.perf_counter() + duration
+    prefix = f"W{worker}"
+    with engine.connect() as connection:
+        while time.perf_counter() < deadline:
+            # 与“清除后导入”相同：在一个事务中删除并重新写入一批考生
+            try:
+                connection.execute(
+                    delete(Student).where(Student.exam_no.like(f"{prefix}%"))
+                )
+                connection.execute(insert(Student), make_students(prefix, BATCH_SIZE))
+                connection.commit()
+                done += 1
+            except OperationalError:
+                connection.rollback()
+                errors += 1
+    return "write", done, errors
+
+
+def run_profile(name, pragmas, duration, readers, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_engine(path, pragmas)
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(Student), make_students("S", 20000))
+        engine.dispose()
+
+        jobs = [(reader, (path, pragmas, duration)) for _ in range(readers)]
+        jobs += [(writer, (path, pragmas, duration, i)) for i in range(writers)]
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = [pool.apply_async(func, args) for func, args in jobs]
+            results = [result.get() for result in results]
+
+    totals = {"read": [0, 0], "write": [0, 0]}
+    for kind, done, errors in results:
+        totals[kind][0] += done
+        totals[kind][1] += errors
+    (reads, read_errors), (writes, write_errors) = totals["read"], totals["write"]
+    print(
+        f"{name:<10} 读 {reads / duration:8.0f} 次/秒（失败 {read_errors}），"
+        f"写 {writes * BATCH_SIZE / duration:8.0f} 行/秒（锁错误 {write_errors}）"
+    )
+    return reads / duration
+
+
+def benchmark(duration, readers, writers):
+    print(f"每项 {duration} 秒，{readers} 个读进程，{writers} 个写进程，每批写入 {BATCH_SIZE} 行")
+    baseline = None
+    for name, pragmas in PROFILES.items():
+        reads = run_profile(name, pragmas, duration, readers, writers)
+        baseline = baseline or reads
+        print(f"{'':<10} 读吞吐加速比 {reads / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    benchmark(*(args + [5, 3, 2][len(args):]))
@@ -6,8 +6,47 @@ load_dotenv(os.path.join(basedir, '.env'))
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'T7UmpQD9snhfxGGC4ZZuTzMd'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///stu-list.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///stu-list.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     BOOTSTRAP_SERVE_LOCAL = True
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME') or 'admin'
-    ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD') or 'changeme'
\ No newline at end of file
+    ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD') or 'changeme'
+    # 导入时每次读取和写入的行数
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE') or 1000)
+    # 批量插入时每条 executemany 语句包含的行数
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE') or 500)
+    # 管理员批量清理数据时每批删除的行数
+    DELETE_CHUNK_SIZE = int(os.environ.get('DELETE_CHUNK_SIZE') or 5000)
+    # 每个进程中执行后台导入任务的线程数
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS') or 2)
+    # 导入任务超过多少秒仍未结束即视为已中断，标记为失败并删除上传文件
+    IMPORT_JOB_TIMEOUT = int(os.environ.get('IMPORT_JOB_TIMEOUT') or 7200)
+    # 密码哈希算法及参数，格式同 werkzeug 的 generate_password_hash
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # 批量导入用户时并行计算密码哈希的进程数
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1)
+    # 导出时每批从数据库游标读取的行数
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 1000)
+    # 导出文件缓存目录的最大总字节数，超过后删除最久未使用的文件
+    EXPORT_CACHE_SIZE = int(os.environ.get('EXPORT_CACHE_SIZE') or 256 * 1024 * 1024)
+    # SQLite 每个新连接执行的 PRAGMA：WAL 模式下导入时其他学校仍可读取，
+    # busy_timeout 为等待写锁的毫秒数，cache_size 为负数时单位为KB
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'wal',
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS') or 'normal',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE') or -32000),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE') or 256 * 1024 * 1024),
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE') or 'memory',
+    }
+    # 写入等待锁超时后的重试次数，及首次重试前等待的秒数（之后每次加倍）
+    DB_LOCK_RETRIES = int(os.environ.get('DB_LOCK_RETRIES') or 5)
+    DB_LOCK_BACKOFF = float(os.environ.get('DB_LOCK_BACKOFF') or 0.1)
+    # 考生、教师搜索最多返回的结果数
+    SEARCH_RESULT_LIMIT = int(os.environ.get('SEARCH_RESULT_LIMIT') or 200)
+    # 输入联想每次最多返回的条数
+    AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT') or 10)
+    # 输入联想的内存索引每隔多少秒检查一次数据版本，版本变化时重建
+    AUTOCOMPLETE_CHECK_INTERVAL = float(os.environ.get('AUTOCOMPLETE_CHECK_INTERVAL') or 5)
+    # 每个进程最多缓存多少个学校、学届的输入联想索引
+    AUTOCOMPLETE_MAX_PARTITIONS = int(os.environ.get('AUTOCOMPLETE_MAX_PARTITIONS') or 64)
\ No newline at end of file